@@ -1,14 +1,32 @@
+import time
+
+_import_started = time.perf_counter()
+
 import pygame
 import random
 import sys
+import os
 import math
 
+# pygame:s egen import (den drar även in numpy) räknas för sig
+_pygame_import_time = time.perf_counter() - _import_started
+
+import engine
+import journal
+import odds
+import particles
+import profiles
+import profiling
+import rendering
+import scenes
+import strategy
+import widgets
+
 # ------------------------------
 # Initiering och globala inställningar
 # ------------------------------
-pygame.init()
-pygame.font.init()
-
+# Att importera modulen öppnar inget fönster; init_display() gör det första
+# gången skärmen behövs, så verktyg och tester kan importera den utan skärm.
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 30
@@ -27,76 +45,225 @@ DARK_RED    = (150, 0, 0)
 CARD_WIDTH = 80
 CARD_HEIGHT = 120
 
-# Skärm, klocka och spelarens pengar
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Avancerat Blackjack")
-clock = pygame.time.Clock()
-player_money = 1000
+# Valfritt läge där statiska skärmar bara ritar om det som ändrats
+# (BLACKJACK_DIRTY_RECTS=1). Annars ritas allt och flip() används som förut.
+DIRTY_RECTS = os.environ.get("BLACKJACK_DIRTY_RECTS") == "1"
+
+# Den enda huvudloopen; alla skärmar är scener som den driver. Skärmar som
+# bara väntar på input sover i pygame.event.wait() (BLACKJACK_ADAPTIVE_PACING=0
+# ritar i stället alltid i FPS bildrutor per sekund).
+ADAPTIVE_PACING = os.environ.get("BLACKJACK_ADAPTIVE_PACING", "1") != "0"
+
+# Mätning av bildrutor och renderingsanrop. F3 visar/döljer HUD:n och slår
+# på mätningen; med BLACKJACK_PROFILE=fil.json mäts allt och sparas som
+# Chrome-trace (fil.json) och CSV (fil.csv) när spelet avslutas.
+PROFILE_PATH = os.environ.get("BLACKJACK_PROFILE")
+
+# Skärmarna ritar alltid i SCREEN_WIDTH x SCREEN_HEIGHT, som skalas en gång per
+# bildruta till fönstret. BLACKJACK_DISPLAY=fullscreen eller t.ex. 1920x1080 väljer
+# fönstret (annars är det lika stort som skärmarna). BLACKJACK_SCALING=hardware
+# låter SDL skala på grafikkortet (pygame.SCALED, med svarta kanter om
+# proportionerna skiljer sig), software ritar om text, kort och bakgrund
+# skarpt i fönstrets storlek och cachar dem (se rendering.ScaledRenderer).
+DISPLAY = os.environ.get("BLACKJACK_DISPLAY", "")
+SCALING = os.environ.get("BLACKJACK_SCALING", "hardware")
+
+# Skärm, klocka, renderare, runtime och profilerare skapas av init_display()
+screen = None
+clock = None
+renderer = None
+runtime = None
+profiler = None
+display_time = None
+
+# Spelarens pengar
+player_money = engine.START_MONEY
 
 # Global flagga för om spelaren redan har huset
 has_house = False
 
-# Standardfont
-DEFAULT_FONT = pygame.font.Font(None, 36)
+# Varje avgjord runda sparas binärt (se journal.py); BLACKJACK_JOURNAL väljer fil
+JOURNAL_PATH = os.environ.get("BLACKJACK_JOURNAL", journal.DEFAULT_PATH)
+round_journal = journal.RoundJournal(JOURNAL_PATH)
+
+# Pengar och hus sparas per spelarnamn efter varje runda och läses vid
+# inloggningen (se profiles.py); BLACKJACK_PROFILES väljer katalog
+PROFILES_DIR = os.environ.get("BLACKJACK_PROFILES", profiles.DEFAULT_DIR)
+player_profiles = profiles.ProfileStore(PROFILES_DIR)
+
+# Grundstrategin för tipset i game_round() (H visar/döljer), laddas vid första tipset
+strategy_table = None
+show_hint = False
+
+# Träningsläge för korträkning (C visar/döljer skons räkning)
+show_count = False
+
+def init_display():
+    """Startar pygame och öppnar fönstret första gången; returnerar runtime:n."""
+    global screen, clock, renderer, runtime, profiler, display_time
+    if runtime is None:
+        started = time.perf_counter()
+        pygame.init()
+        screen, renderer = open_window()
+        pygame.display.set_caption("Avancerat Blackjack")
+        clock = pygame.time.Clock()
+        runtime = scenes.SceneRuntime(screen, renderer, clock, FPS, adaptive=ADAPTIVE_PACING)
+        profiler = runtime.profiler = profiling.Profiler(FPS)
+        profiler.renderer = renderer
+        profiler.track(sys.modules[__name__], "draw_dynamic_background")
+        profiler.track(Card, "draw", "Card.draw")
+        profiler.track(rendering, "render_text")
+        if PROFILE_PATH:
+            profiler.enable()
+        display_time = time.perf_counter() - started
+    return runtime
+
+def parse_display(value):
+    """BLACKJACK_DISPLAY som (storlek eller None, helskärm)."""
+    if value in ("", "fullscreen"):
+        return None, value == "fullscreen"
+    try:
+        width, height = (int(n) for n in value.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"ogiltig skärmstorlek: {value!r} (t.ex. 1920x1080 eller fullscreen)") from None
+    return (width, height), False
+
+def resize_scaled_window(size):
+    """Sätter fönstrets storlek med pygame.SCALED; ytan att rita på behåller sin."""
+    try:
+        from pygame._sdl2 import video
+        video.Window.from_display_module().size = size
+    except (ImportError, AttributeError, pygame.error) as error:
+        raise ValueError(f"kan inte ge fönstret storleken {size[0]}x{size[1]} med hårdvaruskalning "
+                         f"({error}); använd BLACKJACK_SCALING=software") from None
+    if pygame.display.get_window_size() != tuple(size):
+        raise ValueError(f"fönstret blev {pygame.display.get_window_size()} i stället för "
+                         f"{size[0]}x{size[1]}; använd BLACKJACK_SCALING=software")
+
+def open_window():
+    """Öppnar fönstret; returnerar ytan som skärmarna ritar på och renderaren."""
+    logical_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+    size, fullscreen = parse_display(DISPLAY)
+    if not fullscreen and size in (None, logical_size):
+        window = pygame.display.set_mode(logical_size)
+        return window, rendering.DirtyRenderer(window, enabled=DIRTY_RECTS)
+    flags = pygame.FULLSCREEN if fullscreen else 0
+    if SCALING not in ("hardware", "software"):
+        raise ValueError(f"okänd skalning: {SCALING!r} (hardware eller software)")
+    if SCALING == "hardware":
+        window = pygame.display.set_mode(logical_size, flags | pygame.SCALED)
+        if size is not None:
+            resize_scaled_window(size)
+        return window, rendering.DirtyRenderer(window, enabled=DIRTY_RECTS)
+    window = pygame.display.set_mode(size or (0, 0), flags)
+    window.fill(rendering.LETTERBOX_COLOR)
+    renderer = rendering.ScaledRenderer(window, logical_size, enabled=DIRTY_RECTS)
+    renderer.register_atlas(card_atlas)
+    widgets.pointer_transform = renderer.logical_pos
+    return pygame.Surface(logical_size).convert(window), renderer
+
+def get_strategy_table():
+    global strategy_table
+    if strategy_table is None:
+        strategy_table = strategy.load_table()
+    return strategy_table
 
 # ------------------------------
 # Hjälpfunktioner för rendering
 # ------------------------------
 def draw_center_text(surface, text, size, color, y):
-    font = pygame.font.Font(None, size)
-    text_surf = font.render(text, True, color)
+    text_surf = rendering.render_text(text, size, color)
     text_rect = text_surf.get_rect(center=(SCREEN_WIDTH // 2, y))
     surface.blit(text_surf, text_rect)
 
 def draw_text(surface, text, size, color, pos):
-    font = pygame.font.Font(None, size)
-    text_surf = font.render(text, True, color)
+    text_surf = rendering.render_text(text, size, color)
     surface.blit(text_surf, pos)
 
+def draw_input_box(surface, rect):
+    surface.blit(rendering.panel_surface(rect.size, BLACK, WHITE), rect.topleft)
+
 def create_gradient_surface(width, height, top_color, bottom_color):
     """Skapar en vertikal gradient som bakgrund."""
-    gradient = pygame.Surface((width, height))
-    for y in range(height):
-        ratio = y / height
-        r = int(top_color[0] * (1 - ratio) + bottom_color[0] * ratio)
-        g = int(top_color[1] * (1 - ratio) + bottom_color[1] * ratio)
-        b = int(top_color[2] * (1 - ratio) + bottom_color[2] * ratio)
-        pygame.draw.line(gradient, (r, g, b), (0, y), (width, y))
-    return gradient
+    return rendering.gradients.surface((width, height), top_color, bottom_color)
+
+_background = None
+
+def get_background():
+    """Gradientbakgrunden, byggd första gången den ritas."""
+    global _background
+    if _background is None:
+        _background = create_gradient_surface(SCREEN_WIDTH, SCREEN_HEIGHT, (0, 0, 128), (0, 0, 255))
+    return _background
+
+# ------------------------------
+# Bas för spelets scener (se scenes.py)
+# ------------------------------
+class GameScene(scenes.Scene):
+    """Scen som ritar på spelets gemensamma bakgrund."""
+    @property
+    def background(self):
+        return get_background()
+
+class MessageScene(GameScene):
+    """Textrader som visas tills spelaren trycker på en tangent eller klickar."""
+    retained = True
+    def __init__(self, lines):
+        super().__init__()
+        self.lines = lines  # (text, storlek, y)
+    def handle_event(self, event):
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+            self.finish()
+    def draw(self, surface):
+        for text, size, y in self.lines:
+            draw_center_text(surface, text, size, WHITE, y)
 
-background = create_gradient_surface(SCREEN_WIDTH, SCREEN_HEIGHT, (0, 0, 128), (0, 0, 255))
+class PauseScene(GameScene):
+    """Bara bakgrunden en kort stund, i stället för pygame.time.delay()."""
+    retained = True
+    def __init__(self, duration):
+        super().__init__()
+        self.after(duration, self.finish)
 
 # ------------------------------
 # Fade-out effekt (ny animation)
 # ------------------------------
+class FadeOutScene(GameScene):
+    """Tonar ner det som redan syns på skärmen till svart."""
+    def __init__(self):
+        super().__init__()
+        self.fade = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.fade.fill(BLACK)
+        self.alpha = 0
+    def update(self, dt):
+        super().update(dt)
+        self.alpha += 5
+        if self.alpha > 255:
+            self.finish()
+    def draw(self, surface):
+        self.fade.set_alpha(self.alpha)
+        surface.blit(self.fade, (0, 0))
+
 def fade_out(duration):
-    fade = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    fade.fill(BLACK)
-    for alpha in range(0, 256, 5):
-        fade.set_alpha(alpha)
-        screen.blit(fade, (0, 0))
-        pygame.display.flip()
-        clock.tick(FPS)
+    yield FadeOutScene()
 
 # ------------------------------
 # Text-skalningsanimation (bounce effect)
 # ------------------------------
+class TextScaleScene(GameScene):
+    """Texten växer från 50% till 100% med bildrutor som renderas en gång."""
+    retained = True
+    def __init__(self, text, size, color, center, duration=1000):
+        super().__init__()
+        self.frames = rendering.scaled_text.frames(text, size, color, duration * FPS // 1000 + 1)
+        self.center = center
+        self.scale = self.tween(duration, self.finish)
+    def draw(self, surface):
+        frame = self.frames[round(self.scale.progress * (len(self.frames) - 1))]
+        surface.blit(frame, frame.get_rect(center=self.center))
+
 def animate_text_scale(text, size, color, center, duration=1000):
-    start_time = pygame.time.get_ticks()
-    while True:
-        now = pygame.time.get_ticks()
-        elapsed = now - start_time
-        if elapsed > duration:
-            break
-        scale = 0.5 + 0.5 * (elapsed / duration)  # Från 50% till 100%
-        current_size = int(size * scale)
-        font_scaled = pygame.font.Font(None, current_size)
-        text_surf = font_scaled.render(text, True, color)
-        text_rect = text_surf.get_rect(center=center)
-        screen.blit(background, (0, 0))
-        screen.blit(text_surf, text_rect)
-        pygame.display.flip()
-        clock.tick(FPS)
+    yield TextScaleScene(text, size, color, center, duration)
 
 # ------------------------------
 # Animation av dynamisk bakgrund
@@ -107,8 +274,8 @@ def draw_dynamic_background(surface, tick):
     bottom_blue = max(0, min(255, 255 - offset))
     top_color = (0, 0, top_blue)
     bottom_color = (0, 0, bottom_blue)
-    gradient = create_gradient_surface(SCREEN_WIDTH, SCREEN_HEIGHT, top_color, bottom_color)
-    surface.blit(gradient, (0, 0))
+    # Remsan för varje offset (högst 101 st) cachas och skalas in i ytan
+    rendering.gradients.draw(surface, top_color, bottom_color)
     for i in range(5):
         x = int((tick * 0.5 + i * 160) % SCREEN_WIDTH)
         y = int(50 + 30 * math.sin((tick + i * 20) / 30))
@@ -128,151 +295,154 @@ def draw_dealer_figure(surface, x, y):
 # ------------------------------
 # Texas-hussevent (ny funktion)
 # ------------------------------
-def texas_house_screen():
-    duration = 3000  # 3 sekunder animation
-    start_time = pygame.time.get_ticks()
-    while pygame.time.get_ticks() - start_time < duration:
-        clock.tick(FPS)
-        screen.blit(background, (0, 0))
+class HouseScene(GameScene, scenes.TimedScene):
+    """Ett hus med ett meddelande under, i 3 sekunder."""
+    duration = 3000
+    def __init__(self, message):
+        super().__init__()
+        self.message = message
+    def draw(self, surface):
+        surface.blit(get_background(), (0, 0))
         house_x = SCREEN_WIDTH // 2 - 100
         house_y = SCREEN_HEIGHT // 2 - 50
         house_width = 200
         house_height = 150
-        pygame.draw.rect(screen, GRAY, (house_x, house_y, house_width, house_height), border_radius=8)
-        pygame.draw.polygon(screen, DARK_RED, [(house_x, house_y),
-                                               (house_x + house_width, house_y),
-                                               (house_x + house_width//2, house_y - 80)])
-        # Meddelandet exakt som önskat:
-        draw_center_text(screen, "grattis du har fått ett hus i Texas", 48, WHITE, SCREEN_HEIGHT // 2 + 150)
-        pygame.display.flip()
-    animate_text_scale("RENTA 75", 48, WHITE, (SCREEN_WIDTH//2, SCREEN_HEIGHT//2), duration=1000)
-    return 75
+        pygame.draw.rect(surface, GRAY, (house_x, house_y, house_width, house_height), border_radius=8)
+        pygame.draw.polygon(surface, DARK_RED, [(house_x, house_y),
+                                                (house_x + house_width, house_y),
+                                                (house_x + house_width // 2, house_y - 80)])
+        draw_center_text(surface, self.message, 48, WHITE, SCREEN_HEIGHT // 2 + 150)
+
+def texas_house_screen():
+    # Meddelandet exakt som önskat:
+    yield HouseScene("grattis du har fått ett hus i Texas")
+    yield from animate_text_scale(f"RENTA {engine.RENT}", 48, WHITE, (SCREEN_WIDTH//2, SCREEN_HEIGHT//2), duration=1000)
+    return engine.RENT
 
 # ------------------------------
 # Las Vegas Introduktionsskärm
 # ------------------------------
-def las_vegas_screen():
+MONEY_CAPACITY = 512
+MONEY_SPAWN_CHANCE = 0.2  # per uppdateringssteg
+
+_bill_sprite = None
+
+def bill_sprite():
+    """Sedeln i pengaregnet, ritad en gång och sedan bara blittad."""
+    global _bill_sprite
+    if _bill_sprite is None:
+        _bill_sprite = pygame.Surface((50, 25), pygame.SRCALPHA)
+        rect = _bill_sprite.get_rect()
+        pygame.draw.rect(_bill_sprite, GREEN, rect, border_radius=8)
+        money_text = rendering.render_text("$", 36, WHITE)
+        _bill_sprite.blit(money_text, money_text.get_rect(center=rect.center))
+        if pygame.display.get_surface() is not None:
+            _bill_sprite = _bill_sprite.convert_alpha()
+    return _bill_sprite
+
+class LasVegasScene(GameScene, scenes.TimedScene):
     duration = 5000  # 5 sekunder
-    start_time = pygame.time.get_ticks()
-    money_objects = []
-    def spawn_money():
+    def __init__(self):
+        super().__init__()
+        # Sedlarna startar ovanför skärmen och försvinner när de nått botten
+        self.money = particles.ParticleSystem(MONEY_CAPACITY, bill_sprite(),
+                                              (0, -50, SCREEN_WIDTH, SCREEN_HEIGHT + 50))
+    def spawn_money(self):
         x = random.randint(0, SCREEN_WIDTH - 50)
         y = -50
-        speed = random.uniform(1, 2)
-        return {"x": x, "y": y, "speed": speed}
-    while pygame.time.get_ticks() - start_time < duration:
-        clock.tick(FPS)
-        if random.random() < 0.2:
-            money_objects.append(spawn_money())
-        for money in money_objects:
-            money["y"] += money["speed"]
-        money_objects = [m for m in money_objects if m["y"] < SCREEN_HEIGHT]
-        screen.blit(background, (0, 0))
-        for money in money_objects:
-            rect = pygame.Rect(money["x"], money["y"], 50, 25)
-            pygame.draw.rect(screen, GREEN, rect, border_radius=8)
-            money_text = DEFAULT_FONT.render("$", True, WHITE)
-            money_text_rect = money_text.get_rect(center=rect.center)
-            screen.blit(money_text, money_text_rect)
-        draw_center_text(screen, "Välkommen till Las Vegas", 64, WHITE, SCREEN_HEIGHT // 2)
-        pygame.display.flip()
+        speed = random.uniform(1, 2) * FPS  # 1-2 pixlar per bildruta
+        self.money.spawn(x, y, 0, speed)
+    def update(self, dt):
+        super().update(dt)
+        if random.random() < MONEY_SPAWN_CHANCE:
+            self.spawn_money()
+        self.money.update(dt)
+    def draw(self, surface):
+        surface.blit(get_background(), (0, 0))
+        self.money.draw(surface)
+        draw_center_text(surface, "Välkommen till Las Vegas", 64, WHITE, SCREEN_HEIGHT // 2)
+
+def las_vegas_screen():
+    yield LasVegasScene()
 
 # ------------------------------
 # Inloggningsskärm med rundade kanter för input-box
 # ------------------------------
-def login_screen():
-    input_str = ""
-    input_box = pygame.Rect(SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT // 2 - 20, 300, 40)
+class LoginScene(GameScene):
+    retained = True
     prompt = "Ange ditt namn:"
-    login_done = False
-    while not login_done:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_BACKSPACE:
-                    input_str = input_str[:-1]
-                elif event.key == pygame.K_RETURN:
-                    if input_str.strip() != "":
-                        login_done = True
-                else:
-                    input_str += event.unicode
-        screen.blit(background, (0, 0))
-        draw_center_text(screen, "Logga in", 64, WHITE, SCREEN_HEIGHT // 2 - 100)
-        draw_center_text(screen, prompt, 36, WHITE, SCREEN_HEIGHT // 2 - 40)
-        pygame.draw.rect(screen, BLACK, input_box, border_radius=8)
-        pygame.draw.rect(screen, WHITE, input_box, 2, border_radius=8)
-        input_surf = DEFAULT_FONT.render(input_str, True, WHITE)
-        screen.blit(input_surf, (input_box.x + 10, input_box.y + 5))
-        draw_center_text(screen, "Tryck Enter när du är klar", 28, WHITE, SCREEN_HEIGHT // 2 + 60)
-        pygame.display.flip()
+    def __init__(self):
+        super().__init__()
+        self.input_str = ""
+        self.input_box = pygame.Rect(SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT // 2 - 20, 300, 40)
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_BACKSPACE:
+                self.input_str = self.input_str[:-1]
+            elif event.key == pygame.K_RETURN:
+                if self.input_str.strip() != "":
+                    self.finish(self.input_str.strip())
+            else:
+                self.input_str += event.unicode
+    def draw(self, surface):
+        draw_center_text(surface, "Logga in", 64, WHITE, SCREEN_HEIGHT // 2 - 100)
+        draw_center_text(surface, self.prompt, 36, WHITE, SCREEN_HEIGHT // 2 - 40)
+        draw_input_box(surface, self.input_box)
+        input_surf = rendering.render_text(self.input_str, 36, WHITE)
+        surface.blit(input_surf, (self.input_box.x + 10, self.input_box.y + 5))
+        draw_center_text(surface, "Tryck Enter när du är klar", 28, WHITE, SCREEN_HEIGHT // 2 + 60)
+
+def login_screen():
+    name = yield LoginScene()
     opponent_list = ["Bert", "Björn", "Kalle", "Mats", "Sven", "Anders", "Erik", "Lars", "Oskar", "Gustav", "Jan", "Per", "Bosse", "Nils", "Ove"]
     opponent_name = random.choice(opponent_list)
-    return input_str.strip(), opponent_name
+    return name, opponent_name
 
 # ------------------------------
-# Kort- och kortlekklasser med rundade kanter
+# Kort- och kortlekklasser med rundade kanter (reglerna finns i engine.py)
 # ------------------------------
-class Card:
-    def __init__(self, suit, rank):
-        self.suit = suit
-        self.rank = rank
-    def get_value(self):
-        if self.rank in ['J', 'Q', 'K']:
-            return 10
-        elif self.rank == 'A':
-            return 11
-        else:
-            return int(self.rank)
+# Nyckel för kortets baksida i atlasen (framsidorna har kortkoderna 0-51)
+CARD_BACK = len(engine.SUITS) * len(engine.RANKS)
+
+def paint_card(cell, key):
+    """Ritar en kortframsida eller baksidan i en atlasruta av valfri storlek."""
+    width, height = cell.get_size()
+    scale = height / CARD_HEIGHT
+    radius = max(1, int(8 * scale))
+    border = max(1, int(2 * scale))
+    margin = int(5 * scale)
+    rect = (0, 0, width, height)
+    if key == CARD_BACK:
+        pygame.draw.rect(cell, DARK_BLUE, rect, border_radius=radius)
+        pygame.draw.rect(cell, WHITE, rect, border, border_radius=radius)
+        text = rendering.render_text("?", int(48 * scale), WHITE)
+        cell.blit(text, text.get_rect(center=(width // 2, height // 2)))
+    else:
+        suit = engine.SUITS[key // len(engine.RANKS)]
+        rank = engine.RANKS[key % len(engine.RANKS)]
+        pygame.draw.rect(cell, WHITE, rect, border_radius=radius)
+        pygame.draw.rect(cell, BLACK, rect, border, border_radius=radius)
+        text = rendering.render_text(f"{rank}{suit}", int(24 * scale), BLACK)
+        cell.blit(text, (margin, margin))
+        text_small = pygame.transform.rotate(text, 180)
+        cell.blit(text_small, (width - text_small.get_width() - margin, height - text_small.get_height() - margin))
+
+# Alla 52 framsidor och baksidan ritas en gång och blittas sedan
+card_atlas = rendering.SpriteAtlas((CARD_WIDTH, CARD_HEIGHT), CARD_BACK + 1, paint_card)
+
+class Card(engine.Card):
+    __slots__ = ()
     def draw(self, surface, x, y, hidden=False):
-        if hidden:
-            pygame.draw.rect(surface, DARK_BLUE, (x, y, CARD_WIDTH, CARD_HEIGHT), border_radius=8)
-            pygame.draw.rect(surface, WHITE, (x, y, CARD_WIDTH, CARD_HEIGHT), 2, border_radius=8)
-            font = pygame.font.Font(None, 48)
-            text = font.render("?", True, WHITE)
-            text_rect = text.get_rect(center=(x + CARD_WIDTH // 2, y + CARD_HEIGHT // 2))
-            surface.blit(text, text_rect)
-        else:
-            pygame.draw.rect(surface, WHITE, (x, y, CARD_WIDTH, CARD_HEIGHT), border_radius=8)
-            pygame.draw.rect(surface, BLACK, (x, y, CARD_WIDTH, CARD_HEIGHT), 2, border_radius=8)
-            font = pygame.font.Font(None, 24)
-            text = font.render(f"{self.rank}{self.suit}", True, BLACK)
-            surface.blit(text, (x + 5, y + 5))
-            text_small = font.render(f"{self.rank}{self.suit}", True, BLACK)
-            text_small = pygame.transform.rotate(text_small, 180)
-            surface.blit(text_small, (x + CARD_WIDTH - text_small.get_width() - 5, y + CARD_HEIGHT - text_small.get_height() - 5))
-
-class Deck:
-    def __init__(self):
-        self.cards = []
-        suits = ['♥', '♦', '♣', '♠']
-        ranks = ['A','2','3','4','5','6','7','8','9','10','J','Q','K']
-        for suit in suits:
-            for rank in ranks:
-                self.cards.append(Card(suit, rank))
-        random.shuffle(self.cards)
-    def deal_card(self):
-        if len(self.cards) == 0:
-            self.__init__()
-        return self.cards.pop()
-
-class Hand:
-    def __init__(self):
-        self.cards = []
-    def add_card(self, card):
-        self.cards.append(card)
-    def get_value(self):
-        total = 0
-        aces = 0
-        for card in self.cards:
-            total += card.get_value()
-            if card.rank == 'A':
-                aces += 1
-        while total > 21 and aces:
-            total -= 10
-            aces -= 1
-        return total
+        card_atlas.blit(surface, CARD_BACK if hidden else self.code, (x, y))
+
+class Deck(engine.Deck):
+    card_class = Card
+
+class Shoe(engine.Shoe):
+    card_class = Card
+
+class Hand(engine.Hand):
+    __slots__ = ()
     def draw(self, surface, x, y, hide_first=False):
         for i, card in enumerate(self.cards):
             pos_x = x + i * (CARD_WIDTH + 15)
@@ -281,365 +451,408 @@ class Hand:
             else:
                 card.draw(surface, pos_x, y, hidden=False)
 
+# Skon vid bordet delas mellan rundorna och blandas om vid klippkortet
+shoe = Shoe()
+
 # ------------------------------
-# Enkel knapp-klass med rundade kanter och hovereffekt
+# Knappar med rundade kanter och hovereffekt finns i widgets.py
 # ------------------------------
-class Button:
-    def __init__(self, rect, color, text, text_color=WHITE):
-        self.rect = pygame.Rect(rect)
-        self.base_color = color
-        self.hover_color = tuple(min(255, c + 50) for c in color)
-        self.text = text
-        self.text_color = text_color
-        self.font = pygame.font.Font(None, 36)
-    def draw(self, surface):
-        mouse_pos = pygame.mouse.get_pos()
-        current_color = self.hover_color if self.rect.collidepoint(mouse_pos) else self.base_color
-        pygame.draw.rect(surface, current_color, self.rect, border_radius=8)
-        pygame.draw.rect(surface, WHITE, self.rect, 2, border_radius=8)
-        text_surf = self.font.render(self.text, True, self.text_color)
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        surface.blit(text_surf, text_rect)
-    def is_clicked(self, pos):
-        return self.rect.collidepoint(pos)
+Button = widgets.Button
 
 # ------------------------------
 # Dealer-turn med "mänsklig" interaktion (med gubbe och bobbningseffekt)
 # ------------------------------
-def dealer_turn(dealer_hand, deck):
-    dealer_comments = [
-        "Hmm, låt mig tänka...",
-        "Jag tar ett kort till.",
-        "Inte tillräckligt högt än!",
-        "Nu drar jag!"
-    ]
-    while dealer_hand.get_value() < 17:
-        comment = random.choice(dealer_comments)
-        draw_dynamic_background(screen, pygame.time.get_ticks())
-        dealer_hand.draw(screen, 100, 150, hide_first=False)
-        start_bob = pygame.time.get_ticks()
-        while pygame.time.get_ticks() - start_bob < 500:
-            bob_offset = 5 * math.sin((pygame.time.get_ticks() - start_bob) / 100)
-            draw_dynamic_background(screen, pygame.time.get_ticks())
-            dealer_hand.draw(screen, 100, 150 + int(bob_offset), hide_first=False)
-            draw_dealer_figure(screen, 400, 150 + int(bob_offset))
-            draw_center_text(screen, comment, 36, WHITE, SCREEN_HEIGHT // 2)
-            pygame.display.flip()
-            clock.tick(FPS)
-        dealer_hand.add_card(deck.deal_card())
-    comment = "Jag stannar nu."
-    draw_dynamic_background(screen, pygame.time.get_ticks())
-    dealer_hand.draw(screen, 100, 150, hide_first=False)
-    draw_dealer_figure(screen, 400, 150)
-    draw_center_text(screen, comment, 36, WHITE, SCREEN_HEIGHT // 2)
-    pygame.display.flip()
-    pygame.time.delay(1000)
+DEALER_COMMENTS = [
+    "Hmm, låt mig tänka...",
+    "Jag tar ett kort till.",
+    "Inte tillräckligt högt än!",
+    "Nu drar jag!"
+]
+
+class DealerTurnScene(GameScene):
+    """Dealern tänker 500 ms per kort och stannar sedan i 1 sekund."""
+    def __init__(self, round_):
+        super().__init__()
+        self.round_ = round_
+        self.comment = None
+        self.thinking = False
+        self.phase_start = 0.0
+        self.next_card()
+    def next_card(self):
+        self.phase_start = self.elapsed
+        if self.round_.dealer_needs_card():
+            self.comment = random.choice(DEALER_COMMENTS)
+            self.thinking = True
+            self.after(500, self.take_card)
+        else:
+            self.round_.finish()
+            self.comment = "Jag stannar nu."
+            self.thinking = False
+            self.after(1000, self.finish)
+    def take_card(self):
+        self.round_.dealer_draw()
+        self.next_card()
+    def draw(self, surface):
+        bob_offset = 5 * math.sin((self.elapsed - self.phase_start) / 100) if self.thinking else 0
+        draw_dynamic_background(surface, self.runtime.time)
+        self.round_.dealer_hand.draw(surface, 100, 150 + int(bob_offset), hide_first=False)
+        draw_dealer_figure(surface, 400, 150 + int(bob_offset))
+        draw_center_text(surface, self.comment, 36, WHITE, SCREEN_HEIGHT // 2)
+
+def dealer_turn(round_):
+    yield DealerTurnScene(round_)
 
 # ------------------------------
 # Arm wrestling-mini-spel med animerad styrkebar
 # ------------------------------
-def arm_wrestling_mini_game():
+class ArmWrestlingScene(GameScene):
     duration = 7000  # 7 sekunder
-    start_time = pygame.time.get_ticks()
-    strength = 50.0
     threshold = 100.0
     decay_per_frame = 0.25
-    while (pygame.time.get_ticks() - start_time < duration) and (strength < 100):
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                strength += 3
-        strength -= decay_per_frame
-        strength = max(0, strength)
-        screen.blit(background, (0, 0))
-        draw_center_text(screen, "ARMBRYTNING!", 48, WHITE, 50)
-        draw_center_text(screen, "Klicka för att pressa!", 32, WHITE, 100)
+    def __init__(self):
+        super().__init__()
+        self.strength = 50.0
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.strength += 3
+    def update(self, dt):
+        super().update(dt)
+        if self.elapsed >= self.duration or self.strength >= 100:
+            self.finish(self.strength >= self.threshold)
+            return
+        self.strength -= self.decay_per_frame
+        self.strength = max(0, self.strength)
+    def draw(self, surface):
+        surface.blit(get_background(), (0, 0))
+        draw_center_text(surface, "ARMBRYTNING!", 48, WHITE, 50)
+        draw_center_text(surface, "Klicka för att pressa!", 32, WHITE, 100)
         bar_width = 400
         bar_height = 30
         bar_x = SCREEN_WIDTH // 2 - bar_width // 2
         bar_y = 250
-        pygame.draw.rect(screen, WHITE, (bar_x, bar_y, bar_width, bar_height), 2, border_radius=8)
-        fill_width = int((min(strength, 100) / 100) * bar_width)
-        pygame.draw.rect(screen, DARK_RED, (bar_x, bar_y, fill_width, bar_height), border_radius=8)
-        status_text = DEFAULT_FONT.render(f"Styrka: {int(strength)}/100", True, WHITE)
-        screen.blit(status_text, (SCREEN_WIDTH // 2 - status_text.get_width() // 2, bar_y + bar_height + 10))
-        pygame.display.flip()
-    return strength >= threshold
+        pygame.draw.rect(surface, WHITE, (bar_x, bar_y, bar_width, bar_height), 2, border_radius=8)
+        fill_width = int((min(self.strength, 100) / 100) * bar_width)
+        pygame.draw.rect(surface, DARK_RED, (bar_x, bar_y, fill_width, bar_height), border_radius=8)
+        status_text = rendering.render_text(f"Styrka: {int(self.strength)}/100", 36, WHITE)
+        surface.blit(status_text, (SCREEN_WIDTH // 2 - status_text.get_width() // 2, bar_y + bar_height + 10))
+
+def arm_wrestling_mini_game():
+    return (yield ArmWrestlingScene())
 
 # ------------------------------
 # Låneman-skärm (interaktiv) med enkel animation
 # ------------------------------
-def loan_man_screen():
+class LoanManScene(GameScene):
     duration = 3000  # 3 sekunder
-    start_time = pygame.time.get_ticks()
-    button_clicked = False
-    button = Button((SCREEN_WIDTH // 2 - 50, SCREEN_HEIGHT - 150, 100, 50), WHITE, "Få lån", text_color=BLACK)
-    while not button_clicked:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if button.is_clicked(pos):
-                    button_clicked = True
-        screen.blit(background, (0, 0))
-        elapsed = pygame.time.get_ticks() - start_time
-        head_x = int((elapsed / duration) * (SCREEN_WIDTH // 2))
+    def __init__(self):
+        super().__init__()
+        self.button = Button((SCREEN_WIDTH // 2 - 50, SCREEN_HEIGHT - 150, 100, 50), WHITE, "Få lån", text_color=BLACK)
+        self.layer = widgets.WidgetLayer([self.button])
+    def handle_event(self, event):
+        if self.layer.handle_event(event) is self.button:
+            self.finish()
+    def draw(self, surface):
+        surface.blit(get_background(), (0, 0))
+        head_x = int((self.elapsed / self.duration) * (SCREEN_WIDTH // 2))
         head_y = SCREEN_HEIGHT // 2 - 100
-        pygame.draw.circle(screen, LIGHT_GREEN, (head_x, head_y), 30)
-        pygame.draw.rect(screen, LIGHT_GREEN, (head_x - 20, head_y + 30, 40, 60), border_radius=8)
-        draw_center_text(screen, "Grattis, du får ett lån!", 48, WHITE, SCREEN_HEIGHT // 2 + 50)
-        button.draw(screen)
-        pygame.display.flip()
-    screen.blit(background, (0, 0))
-    pygame.display.flip()
-    pygame.time.delay(500)
+        pygame.draw.circle(surface, LIGHT_GREEN, (head_x, head_y), 30)
+        pygame.draw.rect(surface, LIGHT_GREEN, (head_x - 20, head_y + 30, 40, 60), border_radius=8)
+        draw_center_text(surface, "Grattis, du får ett lån!", 48, WHITE, SCREEN_HEIGHT // 2 + 50)
+        self.layer.draw(surface)
+
+def loan_man_screen():
+    yield LoanManScene()
+    yield PauseScene(500)
 
 # ------------------------------
 # Skärmar för satsning, runda-sammanfattning och game over
 # ------------------------------
-def betting_screen(current_money):
-    bet_str = ""
-    bet = 0
+class BettingScene(GameScene):
+    retained = True
     title_y = 100
     balance_y = 150
     input_box_y = 220
     buttons_y = 290
     confirm_y = 360
     instruction_y = 430
-    draw_text(screen, f"Spelare: {player_name}", 28, WHITE, (50, 20))
-    draw_text(screen, f"Motståndare: {opponent_name}", 28, WHITE, (50, 50))
-    input_box = pygame.Rect(SCREEN_WIDTH // 2 - 100, input_box_y, 200, 40)
-    dec_button = Button((SCREEN_WIDTH // 2 - 220, buttons_y, 100, 50), WHITE, "Minska", text_color=BLACK)
-    inc_button = Button((SCREEN_WIDTH // 2 + 120, buttons_y, 100, 50), WHITE, "Öka", text_color=BLACK)
-    confirm_button = Button((SCREEN_WIDTH // 2 - 50, confirm_y, 100, 50), WHITE, "Satsa", text_color=BLACK)
-    selecting = True
-    while selecting:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_BACKSPACE:
-                    bet_str = bet_str[:-1]
-                elif event.key == pygame.K_RETURN:
-                    if bet > 0:
-                        selecting = False
-                else:
-                    if event.unicode.isdigit():
-                        bet_str += event.unicode
-                bet = int(bet_str) if bet_str != "" else 0
-                if bet > current_money:
-                    bet = current_money
-                    bet_str = str(bet)
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if inc_button.is_clicked(pos) and bet < current_money:
-                    bet += 10
-                    bet_str = str(bet)
-                elif dec_button.is_clicked(pos) and bet >= 10:
-                    bet = max(0, bet - 10)
-                    bet_str = str(bet)
-                elif confirm_button.is_clicked(pos) and bet > 0:
-                    selecting = False
-        screen.blit(background, (0, 0))
-        draw_center_text(screen, "Satsa pengar", 48, WHITE, title_y)
-        draw_center_text(screen, f"Du har: {current_money} kr", 36, WHITE, balance_y)
-        pygame.draw.rect(screen, BLACK, input_box, border_radius=8)
-        pygame.draw.rect(screen, WHITE, input_box, 2, border_radius=8)
-        input_font = pygame.font.Font(None, 32)
-        input_text = input_font.render(bet_str if bet_str != "" else "0", True, WHITE)
-        screen.blit(input_text, (input_box.x + 10, input_box.y + 5))
-        draw_center_text(screen, f"Aktuell insats: {bet} kr", 36, WHITE, confirm_y - 30)
-        dec_button.draw(screen)
-        inc_button.draw(screen)
-        confirm_button.draw(screen)
-        draw_center_text(screen, "Använd tangentbordet eller knapparna för att ange insats", 24, WHITE, instruction_y)
-        draw_text(screen, f"Spelare: {player_name}", 28, WHITE, (50, 20))
-        draw_text(screen, f"Motståndare: {opponent_name}", 28, WHITE, (50, 50))
-        pygame.display.flip()
-    return bet
+    def __init__(self, current_money):
+        super().__init__()
+        self.current_money = current_money
+        self.bet_str = ""
+        self.bet = 0
+        self.input_box = pygame.Rect(SCREEN_WIDTH // 2 - 100, self.input_box_y, 200, 40)
+        self.dec_button = Button((SCREEN_WIDTH // 2 - 220, self.buttons_y, 100, 50), WHITE, "Minska", text_color=BLACK)
+        self.inc_button = Button((SCREEN_WIDTH // 2 + 120, self.buttons_y, 100, 50), WHITE, "Öka", text_color=BLACK)
+        self.confirm_button = Button((SCREEN_WIDTH // 2 - 50, self.confirm_y, 100, 50), WHITE, "Satsa", text_color=BLACK)
+        self.layer = widgets.WidgetLayer([self.dec_button, self.inc_button, self.confirm_button])
+    def handle_event(self, event):
+        global show_count
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_c:
+            show_count = not show_count
+            return
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_BACKSPACE:
+                self.bet_str = self.bet_str[:-1]
+            elif event.key == pygame.K_RETURN:
+                if self.bet > 0:
+                    self.finish(self.bet)
+                    return
+            else:
+                if event.unicode.isdigit():
+                    self.bet_str += event.unicode
+            self.bet = int(self.bet_str) if self.bet_str != "" else 0
+            if self.bet > self.current_money:
+                self.bet = self.current_money
+                self.bet_str = str(self.bet)
+        clicked = self.layer.handle_event(event)
+        if clicked is self.inc_button and self.bet < self.current_money:
+            self.bet += 10
+            self.bet_str = str(self.bet)
+        elif clicked is self.dec_button and self.bet >= 10:
+            self.bet = max(0, self.bet - 10)
+            self.bet_str = str(self.bet)
+        elif clicked is self.confirm_button and self.bet > 0:
+            self.finish(self.bet)
+    def draw(self, surface):
+        draw_center_text(surface, "Satsa pengar", 48, WHITE, self.title_y)
+        draw_center_text(surface, f"Du har: {self.current_money} kr", 36, WHITE, self.balance_y)
+        draw_input_box(surface, self.input_box)
+        input_text = rendering.render_text(self.bet_str if self.bet_str != "" else "0", 32, WHITE)
+        surface.blit(input_text, (self.input_box.x + 10, self.input_box.y + 5))
+        draw_center_text(surface, f"Aktuell insats: {self.bet} kr", 36, WHITE, self.confirm_y - 30)
+        self.layer.draw(surface)
+        draw_center_text(surface, "Använd tangentbordet eller knapparna för att ange insats", 24, WHITE, self.instruction_y)
+        draw_text(surface, f"Spelare: {player_name}", 28, WHITE, (50, 20))
+        draw_text(surface, f"Motståndare: {opponent_name}", 28, WHITE, (50, 50))
+        if show_count:
+            draw_text(surface, count_text(shoe), 28, WHITE, (560, 20))
 
-def round_summary_screen(player_hand, dealer_hand, outcome):
-    continue_button = Button((SCREEN_WIDTH // 2 - 50, SCREEN_HEIGHT - 100, 100, 50), WHITE, "Fortsätt", text_color=BLACK)
+def betting_screen(current_money):
+    return (yield BettingScene(current_money))
+
+class RoundSummaryScene(GameScene):
+    retained = True
     header_y = 50
     dealer_y = 120
     player_y = 320
     continue_msg_y = 520
-    summary_shown = True
-    while summary_shown:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if continue_button.is_clicked(pygame.mouse.get_pos()):
-                    summary_shown = False
-        screen.blit(background, (0, 0))
-        draw_center_text(screen, "Runda Sammanfattning", 48, WHITE, header_y)
-        dealer_hand.draw(screen, 100, dealer_y, hide_first=False)
-        draw_text(screen, f"{opponent_name}'s poäng: {dealer_hand.get_value()}", 32, WHITE, (100, dealer_y - 40))
-        player_hand.draw(screen, 100, player_y, hide_first=False)
-        draw_text(screen, f"{player_name}'s poäng: {player_hand.get_value()}", 32, WHITE, (100, player_y - 40))
-        draw_center_text(screen, "Tryck på 'Fortsätt' för att se resultatet", 28, WHITE, continue_msg_y)
-        continue_button.draw(screen)
-        pygame.display.flip()
-    animate_text_scale(outcome, 64, WHITE, (SCREEN_WIDTH//2, SCREEN_HEIGHT//2), duration=1000)
-    result_shown = True
-    while result_shown:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
-                result_shown = False
-        screen.blit(background, (0, 0))
-        draw_center_text(screen, outcome, 64, WHITE, SCREEN_HEIGHT // 2)
-        draw_center_text(screen, "Tryck på en tangent för att fortsätta", 28, WHITE, SCREEN_HEIGHT // 2 + 70)
-        pygame.display.flip()
+    def __init__(self, player_hand, dealer_hand):
+        super().__init__()
+        self.player_hand = player_hand
+        self.dealer_hand = dealer_hand
+        self.continue_button = Button((SCREEN_WIDTH // 2 - 50, SCREEN_HEIGHT - 100, 100, 50), WHITE, "Fortsätt", text_color=BLACK)
+        self.layer = widgets.WidgetLayer([self.continue_button])
+    def handle_event(self, event):
+        if self.layer.handle_event(event) is self.continue_button:
+            self.finish()
+    def draw(self, surface):
+        draw_center_text(surface, "Runda Sammanfattning", 48, WHITE, self.header_y)
+        self.dealer_hand.draw(surface, 100, self.dealer_y, hide_first=False)
+        draw_text(surface, f"{opponent_name}'s poäng: {self.dealer_hand.get_value()}", 32, WHITE, (100, self.dealer_y - 40))
+        self.player_hand.draw(surface, 100, self.player_y, hide_first=False)
+        draw_text(surface, f"{player_name}'s poäng: {self.player_hand.get_value()}", 32, WHITE, (100, self.player_y - 40))
+        draw_center_text(surface, "Tryck på 'Fortsätt' för att se resultatet", 28, WHITE, self.continue_msg_y)
+        self.layer.draw(surface)
+
+def round_summary_screen(player_hand, dealer_hand, outcome):
+    yield RoundSummaryScene(player_hand, dealer_hand)
+    yield from animate_text_scale(outcome, 64, WHITE, (SCREEN_WIDTH//2, SCREEN_HEIGHT//2), duration=1000)
+    yield MessageScene([(outcome, 64, SCREEN_HEIGHT // 2),
+                        ("Tryck på en tangent för att fortsätta", 28, SCREEN_HEIGHT // 2 + 70)])
 
 def game_over_screen():
-    over = True
-    animate_text_scale("Game Over!", 64, WHITE, (SCREEN_WIDTH//2, SCREEN_HEIGHT//2), duration=1000)
-    while over:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
-                over = False
-        screen.blit(background, (0, 0))
-        draw_center_text(screen, "Game Over!", 64, WHITE, SCREEN_HEIGHT // 2 - 50)
-        draw_center_text(screen, "Tryck på en tangent för att avsluta", 32, WHITE, SCREEN_HEIGHT // 2 + 20)
-        pygame.display.flip()
+    yield from animate_text_scale("Game Over!", 64, WHITE, (SCREEN_WIDTH//2, SCREEN_HEIGHT//2), duration=1000)
+    yield MessageScene([("Game Over!", 64, SCREEN_HEIGHT // 2 - 50),
+                        ("Tryck på en tangent för att avsluta", 32, SCREEN_HEIGHT // 2 + 20)])
+
+def outcome_text(result):
+    """Texten som visas för spelaren för en resultatkod från motorn."""
+    if result == engine.PLAYER_BUST:
+        return f"{player_name}, du fick för mycket! Du förlorade."
+    elif result == engine.DEALER_BUST:
+        return f"{opponent_name} fick för mycket! Du vann!"
+    elif result == engine.DEALER_WIN:
+        return f"{opponent_name} vann!"
+    elif result == engine.PLAYER_WIN:
+        return f"Du vann, {player_name}!"
+    else:
+        return "Oavgjort!"
+
+def dealer_bust_chance(round_):
+    """Exakt chans att dealern går över, givet det spelaren kan se."""
+    hole_card, upcard = round_.dealer_hand.cards[:2]
+    unseen = odds.composition_of([hole_card], base=round_.deck.composition())
+    return odds.dealer_distribution(upcard, unseen)[odds.BUST]
+
+def count_text(deck, hidden=()):
+    """Skons räkning som spelaren kan se den, utan dolda kort."""
+    system = deck.count_system
+    running = deck.running_count - sum(system.tags[card.code % len(engine.RANKS)] for card in hidden)
+    decks = (deck.remaining + len(hidden)) / (len(engine.SUITS) * len(engine.RANKS))
+    true_count = running / decks if decks else 0.0
+    return f"{system.name}: {running:+d} (sann {true_count:+.1f})"
+
+class GameRoundScene(GameScene):
+    """Spelarens tur; avslutas när spelaren stannar eller går över."""
+    retained = True
+    def __init__(self, round_):
+        super().__init__()
+        self.round_ = round_
+        self.bust_chance = dealer_bust_chance(round_)
+        self.hit_button = Button((100, SCREEN_HEIGHT - 100, 150, 50), WHITE, "Ta kort", text_color=BLACK)
+        self.stand_button = Button((300, SCREEN_HEIGHT - 100, 150, 50), WHITE, "Stanna", text_color=BLACK)
+        self.layer = widgets.WidgetLayer([self.hit_button, self.stand_button])
+    def handle_event(self, event):
+        global show_hint, show_count
+        round_ = self.round_
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+            show_hint = not show_hint
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_c:
+            show_count = not show_count
+        clicked = self.layer.handle_event(event)
+        if clicked is self.hit_button and round_.player_turn:
+            round_.hit()
+            self.bust_chance = dealer_bust_chance(round_)
+        elif clicked is self.stand_button and round_.player_turn:
+            round_.stand()
+        if not round_.player_turn:
+            self.finish()
+    def draw(self, surface):
+        player_hand = self.round_.player_hand
+        dealer_hand = self.round_.dealer_hand
+        draw_center_text(surface, f"{opponent_name}'s hand", 36, WHITE, 50)
+        draw_center_text(surface, f"{player_name}'s hand", 36, WHITE, SCREEN_HEIGHT - 250)
+        dealer_hand.draw(surface, 100, 150, hide_first=True)
+        player_hand.draw(surface, 100, SCREEN_HEIGHT - 250, hide_first=False)
+        draw_text(surface, f"Värde: {player_hand.get_value()}", 28, WHITE, (100, SCREEN_HEIGHT - 310))
+        draw_text(surface, f"Chans att {opponent_name} går över: {self.bust_chance:.0%}", 28, WHITE, (100, 60))
+        if show_hint:
+            hint = "Ta kort" if get_strategy_table()(player_hand, dealer_hand.cards[1]) else "Stanna"
+            draw_text(surface, f"Tips: {hint}", 28, WHITE, (600, SCREEN_HEIGHT - 210))
+        if show_count:
+            draw_text(surface, count_text(self.round_.deck, hidden=dealer_hand.cards[:1]), 28, WHITE, (560, 20))
+        self.layer.draw(surface)
+        draw_text(surface, f"Pengar: {player_money} kr", 28, WHITE, (600, SCREEN_HEIGHT - 240))
 
 def game_round(bet):
-    deck = Deck()
-    player_hand = Hand()
-    dealer_hand = Hand()
-    player_hand.add_card(deck.deal_card())
-    player_hand.add_card(deck.deal_card())
-    dealer_hand.add_card(deck.deal_card())
-    dealer_hand.add_card(deck.deal_card())
-    outcome = ""
-    player_turn = True
-    round_active = True
-    while round_active:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN and player_turn:
-                pos = pygame.mouse.get_pos()
-                hit_button_rect = pygame.Rect(100, SCREEN_HEIGHT - 100, 150, 50)
-                stand_button_rect = pygame.Rect(300, SCREEN_HEIGHT - 100, 150, 50)
-                if hit_button_rect.collidepoint(pos):
-                    player_hand.add_card(deck.deal_card())
-                    if player_hand.get_value() > 21:
-                        outcome = f"{player_name}, du fick för mycket! Du förlorade."
-                        player_turn = False
-                        round_active = False
-                elif stand_button_rect.collidepoint(pos):
-                    player_turn = False
-        if not player_turn and round_active:
-            dealer_turn(dealer_hand, deck)
-            player_val = player_hand.get_value()
-            dealer_val = dealer_hand.get_value()
-            if player_val > 21:
-                outcome = f"{player_name}, du fick för mycket! Du förlorade."
-            elif dealer_val > 21:
-                outcome = f"{opponent_name} fick för mycket! Du vann!"
-            elif dealer_val > player_val:
-                outcome = f"{opponent_name} vann!"
-            elif dealer_val < player_val:
-                outcome = f"Du vann, {player_name}!"
-            else:
-                outcome = "Oavgjort!"
-            round_active = False
-        screen.blit(background, (0, 0))
-        draw_center_text(screen, f"{opponent_name}'s hand", 36, WHITE, 50)
-        draw_center_text(screen, f"{player_name}'s hand", 36, WHITE, SCREEN_HEIGHT - 250)
-        dealer_hand.draw(screen, 100, 150, hide_first=player_turn)
-        player_hand.draw(screen, 100, SCREEN_HEIGHT - 250, hide_first=False)
-        font = pygame.font.Font(None, 28)
-        draw_text(screen, f"Värde: {player_hand.get_value()}", 28, WHITE, (100, SCREEN_HEIGHT - 310))
-        if not player_turn:
-            draw_text(screen, f"Värde: {dealer_hand.get_value()}", 28, WHITE, (100, 60))
-        if player_turn:
-            hit_button = Button((100, SCREEN_HEIGHT - 100, 150, 50), WHITE, "Ta kort", text_color=BLACK)
-            stand_button = Button((300, SCREEN_HEIGHT - 100, 150, 50), WHITE, "Stanna", text_color=BLACK)
-            hit_button.draw(screen)
-            stand_button.draw(screen)
-        draw_text(screen, f"Pengar: {player_money} kr", 28, WHITE, (600, SCREEN_HEIGHT - 240))
-        pygame.display.flip()
-    round_summary_screen(player_hand, dealer_hand, outcome)
-    return outcome
+    round_ = engine.Round(shoe, hand_class=Hand)
+    yield GameRoundScene(round_)
+    if not round_.done:
+        yield from dealer_turn(round_)
+    yield from round_summary_screen(round_.player_hand, round_.dealer_hand, outcome_text(round_.result))
+    return round_
 
 def new_house_screen():
-    duration = 3000  # 3 sekunder
-    start_time = pygame.time.get_ticks()
-    while pygame.time.get_ticks() - start_time < duration:
-        clock.tick(FPS)
-        screen.blit(background, (0, 0))
-        house_x = SCREEN_WIDTH // 2 - 100
-        house_y = SCREEN_HEIGHT // 2 - 50
-        house_width = 200
-        house_height = 150
-        pygame.draw.rect(screen, GRAY, (house_x, house_y, house_width, house_height), border_radius=8)
-        pygame.draw.polygon(screen, DARK_RED, [(house_x, house_y),
-                                               (house_x + house_width, house_y),
-                                               (house_x + house_width // 2, house_y - 80)])
-        draw_center_text(screen, "Grattis, du har köpt ett nytt hus!", 48, WHITE, SCREEN_HEIGHT // 2 + 150)
-        pygame.display.flip()
+    yield HouseScene("Grattis, du har köpt ett nytt hus!")
 
-def main():
+def game_flow():
+    """Hela spelet som en följd av scener, i samma ordning som förut."""
     global player_money, player_name, opponent_name, has_house
-    player_name, opponent_name = login_screen()
-    waiting = True
-    while waiting:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
-                waiting = False
-        screen.blit(background, (0, 0))
-        draw_center_text(screen, f"Välkommen, {player_name}!", 64, WHITE, SCREEN_HEIGHT // 2 - 100)
-        draw_center_text(screen, f"Motståndare: {opponent_name}", 36, WHITE, SCREEN_HEIGHT // 2 - 30)
-        draw_center_text(screen, "Tryck på en tangent för att starta", 36, WHITE, SCREEN_HEIGHT // 2 + 20)
-        pygame.display.flip()
+    player_name, opponent_name = yield from login_screen()
+    profile = player_profiles.get(player_name)
+    if profile is None:
+        greeting = f"Välkommen, {player_name}!"
+    else:
+        player_money, has_house = profile["money"], profile["has_house"]
+        greeting = f"Välkommen tillbaka, {player_name}!"
+    yield MessageScene([(greeting, 64, SCREEN_HEIGHT // 2 - 100),
+                        (f"Motståndare: {opponent_name}", 36, SCREEN_HEIGHT // 2 - 30),
+                        ("Tryck på en tangent för att starta", 36, SCREEN_HEIGHT // 2 + 20)])
     playing = True
     while playing:
-        bet = betting_screen(player_money)
-        outcome = game_round(bet)
-        if outcome in [f"{player_name}, du fick för mycket! Du förlorade.", f"{opponent_name} vann!"]:
-            player_money -= bet
-        elif outcome in [f"{opponent_name} fick för mycket! Du vann!", f"Du vann, {player_name}!"]:
-            player_money += bet
-        # Om spelaren inte äger huset än och har nått 3000 kr, köp huset (Texas-event)
-        if not has_house and player_money >= 3000:
-            texas_house_screen()
-            has_house = True
-        # Om spelaren redan äger huset, visa "RENTA 75" efter varje blackjackrunda
-        if has_house:
-            animate_text_scale("RENTA 75", 48, WHITE, (SCREEN_WIDTH//2, SCREEN_HEIGHT//2), duration=1000)
-            player_money -= 75
-        if player_money <= 0:
-            las_vegas_screen()
-            if arm_wrestling_mini_game():
-                loan_man_screen()
-                screen.blit(background, (0, 0))
-                pygame.display.flip()
-                pygame.time.delay(500)
-                player_money = 500
+        bet = yield from betting_screen(player_money)
+        round_ = yield from game_round(bet)
+        # Ekonomin räknas av engine.settle() (samma som i server.py); skärmarna
+        # visas efter händelserna. Armbrytningen spelas bara om pengarna tagit
+        # slut, och vid vinst räknas rundan om med lånet.
+        money_before, house_before, payout = player_money, has_house, round_.payout(bet)
+        player_money, has_house, events = engine.settle(money_before, house_before, payout)
+        # Texas-eventet när spelaren når 3000 kr och köper huset
+        if "house" in events:
+            yield from texas_house_screen()
+        # Med huset visas "RENTA 75" efter varje blackjackrunda
+        if "rent" in events:
+            yield from animate_text_scale(f"RENTA {engine.RENT}", 48, WHITE, (SCREEN_WIDTH//2, SCREEN_HEIGHT//2), duration=1000)
+        if "game_over" in events:
+            yield from las_vegas_screen()
+            if (yield from arm_wrestling_mini_game()):
+                yield from loan_man_screen()
+                yield PauseScene(500)
+                player_money, has_house, events = engine.settle(money_before, house_before, payout,
+                                                                won_arm_wrestle=True)
             else:
-                game_over_screen()
+                yield from game_over_screen()
                 playing = False
-        new_house_screen()  # Eventuellt hus-event vid rundans slut (om så önskas)
-        pygame.display.flip()
+        # Pengarna efter hyra och eventuellt lån, så att posterna hänger ihop
+        round_journal.append(round_, bet, player_money)
+        # Skrivs av profilernas egen tråd, så bildrutorna väntar inte på disken.
+        # Efter game over börjar nästa inloggning om från början.
+        if playing:
+            player_profiles.save(player_name, player_money, has_house)
+        else:
+            player_profiles.save(player_name, engine.START_MONEY, False)
+        yield from new_house_screen()  # Eventuellt hus-event vid rundans slut (om så önskas)
+
+# ------------------------------
+# Starttid
+# ------------------------------
+import_time = time.perf_counter() - _import_started - _pygame_import_time
+
+# Budget i ms: modulens egen import (utan pygame) och från import till första bildrutan
+STARTUP_BUDGET = {"import": 50, "first_frame": 500}
+
+def startup_report():
+    """Uppmätt starttid i ms och om den håller sig inom STARTUP_BUDGET."""
+    report = {"pygame": _pygame_import_time * 1000, "import": import_time * 1000}
+    if display_time is not None:
+        report["display"] = display_time * 1000
+    if runtime is not None and runtime.first_frame_at is not None:
+        report["first_frame"] = (runtime.first_frame_at - _import_started) * 1000
+    report["within_budget"] = all(report[k] <= limit for k, limit in STARTUP_BUDGET.items() if k in report)
+    return report
+
+def check_startup():
+    """Visar inloggningsskärmens första bildruta och skriver ut starttiden."""
+    def first_frame():
+        yield LoginScene()
+    runtime = init_display()
+    runtime.start(first_frame())
+    runtime.draw()
+    report = startup_report()
+    for key, value in report.items():
+        if key != "within_budget":
+            budget = STARTUP_BUDGET.get(key)
+            print(f"{key:12s} {value:8.1f} ms" + (f"  (budget {budget} ms)" if budget else ""))
+    print("Inom budget" if report["within_budget"] else "Över budget!")
+    return report["within_budget"]
+
+def save_profile(path):
+    """Sparar mätningen som Chrome-trace och CSV och skriver ut en sammanfattning."""
+    profiler.write_chrome_trace(path)
+    profiler.write_csv(os.path.splitext(path)[0] + ".csv")
+    for scene, stats in profiler.summary().items():
+        print(f"{scene:20s} {stats['frames']:6d} bildrutor  medel {stats['mean_ms']:6.2f} ms  "
+              f"p95 {stats['p95_ms']:6.2f} ms  logik {stats['logic_ms']:5.2f}  "
+              f"rendering {stats['render_ms']:5.2f}  tappade {stats['dropped']}")
+    cache = profiler.cache_stats()
+    text = cache["text_cache"]
+    print(f"Textcache: {text['hits']} träffar, {text['misses']} missar ({text['hit_rate']:.1%}), "
+          f"{text['evictions']} utkastade, {text['entries']} ytor")
+    drawn = cache["renderer"]
+    print(f"Renderare: {drawn['frames']} bildrutor, {drawn['full_frames']} helt omritade, "
+          f"{drawn['fill_ratio']:.1%} av skärmen omritad i snitt")
+
+def main():
+    if "--startup-time" in sys.argv[1:]:
+        ok = check_startup()
+        pygame.quit()
+        sys.exit(0 if ok else 1)
+    # Stängs fönstret avbryter runtime:n flödet, oavsett vilken scen som visas
+    init_display().run(game_flow())
+    round_journal.close()
+    player_profiles.close()
+    if PROFILE_PATH:
+        save_profile(PROFILE_PATH)
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,317 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+# Skärmarna körs utan fönster
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import engine
+import rendering
+import scenes
+import simulation
+import Spelet2
+
+# ------------------------------
+# Prestandamätningar för skärmar och spelmotor
+# ------------------------------
+# Varje mätning ger ett värde där högre är bättre (bildrutor/s eller
+# operationer/s). Resultaten kan sparas som baslinje och jämföras mot
+# senare körningar för att hitta prestandaregressioner.
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_FRAMES = 300
+DEFAULT_TOLERANCE = 0.2
+REPEAT = 3
+
+class FixedClock:
+    """Klocka som alltid rapporterar exakt ett steg och aldrig sover.
+
+    Scenerna går då lika långt per bildruta varje körning, och loopen körs
+    så fort som möjligt.
+    """
+    def __init__(self, fps):
+        self.step = 1000.0 / fps
+    def tick(self, framerate=0):
+        return self.step
+
+def _pointer(widget):
+    # Händelserna kommer från fönstret, som kan vara skalat (BLACKJACK_DISPLAY)
+    return Spelet2.renderer.window_pos(widget.rect.center)
+
+def click(widget):
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=_pointer(widget), button=1)
+
+def hover(widget):
+    return pygame.event.Event(pygame.MOUSEMOTION, pos=_pointer(widget), rel=(0, 0), buttons=(0, 0, 0))
+
+def key(k, unicode=""):
+    return pygame.event.Event(pygame.KEYDOWN, key=k, unicode=unicode, mod=0)
+
+# ------------------------------
+# Skärmar med skriptad input
+# ------------------------------
+def _standing_round():
+    round_ = engine.Round(Spelet2.shoe, hand_class=Spelet2.Hand)
+    round_.stand()
+    return round_
+
+def _continue_script(scene, frame):
+    """Klickar vidare genom sammanfattning och resultat."""
+    if isinstance(scene, Spelet2.RoundSummaryScene) and frame % 10 == 0:
+        return [hover(scene.continue_button), click(scene.continue_button)]
+    if isinstance(scene, Spelet2.MessageScene) and frame % 10 == 0:
+        return [key(pygame.K_SPACE, " ")]
+    return []
+
+def game_round_script(scene, frame):
+    if isinstance(scene, Spelet2.GameRoundScene):
+        if frame % 50 == 1:
+            return [key(pygame.K_h, "h")]
+        if frame % 15 == 0:
+            hand = scene.round_.player_hand
+            button = scene.hit_button if hand.get_value() < engine.DEALER_STANDS_ON else scene.stand_button
+            return [hover(button), click(button)]
+        return []
+    return _continue_script(scene, frame)
+
+def betting_script(scene, frame):
+    if frame % 60 == 59:
+        return [key(pygame.K_RETURN, "\r")]
+    step = frame % 10
+    if step == 0:
+        return [hover(scene.inc_button)]
+    if step == 2:
+        return [click(scene.inc_button)]
+    if step == 4:
+        return [hover(scene.dec_button), click(scene.dec_button)]
+    if step == 6:
+        return [key(pygame.K_5, "5")]
+    if step == 8:
+        return [key(pygame.K_BACKSPACE)]
+    return []
+
+SCREENS = {
+    "las_vegas_screen": (Spelet2.las_vegas_screen, None),
+    "dealer_turn": (lambda: Spelet2.dealer_turn(_standing_round()), None),
+    "game_round": (lambda: Spelet2.game_round(10), game_round_script),
+    "betting_screen": (lambda: Spelet2.betting_screen(engine.START_MONEY), betting_script),
+    "texas_house_screen": (Spelet2.texas_house_screen, None),
+}
+
+def _run_frames(make_flow, script, frames):
+    runtime = scenes.SceneRuntime(Spelet2.screen, Spelet2.renderer, FixedClock(Spelet2.FPS),
+                                  Spelet2.FPS, adaptive=False)
+    def flow():
+        while True:
+            yield from make_flow()
+    pygame.event.clear()
+    runtime.start(flow())
+    start = time.perf_counter()
+    for frame in range(frames):
+        if script is not None:
+            for event in script(runtime.scene, frame):
+                pygame.event.post(event)
+        runtime.frame()
+    return time.perf_counter() - start
+
+def bench_screen(name, frames=DEFAULT_FRAMES):
+    """Bildrutor/s för en skärm, plus minnestopp och kvarhållet minne."""
+    make_flow, script = SCREENS[name]
+    random.seed(1)
+    rendering.text_cache.reset_stats()
+    Spelet2.renderer.reset_stats()
+    elapsed = min(_run_frames(make_flow, script, frames) for _ in range(REPEAT))
+    text_stats = rendering.text_cache.stats()
+    render_stats = Spelet2.renderer.stats()
+    # En separat körning med tracemalloc, som annars skulle påverka tiden
+    random.seed(1)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    _run_frames(make_flow, script, frames)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "value": frames / elapsed,
+        "unit": "fps",
+        "frames": frames,
+        "ms_per_frame": elapsed * 1000 / frames,
+        "peak_kb": (peak - before) / 1024,
+        "retained_kb": (after - before) / 1024,
+        # Över alla REPEAT körningar
+        "text_cache_hit_rate": text_stats["hit_rate"],
+        "text_cache_misses": text_stats["misses"],
+        "retained_frames": render_stats["frames"],
+        "full_frames": render_stats["full_frames"],
+        "fill_ratio": render_stats["fill_ratio"],
+    }
+
+def check_first_draw():
+    """Att en statisk scen ritas direkt efter ett scenbyte, utan att vänta på input.
+
+    Med adaptiv takt får runtime:n inte blockera i pygame.event.wait() innan
+    den nya scenens första bildruta har ritats. Returnerar (bildrutor efter
+    bytet, om någon väntade, ms till första ritningen).
+    """
+    runtime = scenes.SceneRuntime(Spelet2.screen, Spelet2.renderer, FixedClock(Spelet2.FPS),
+                                  Spelet2.FPS, adaptive=True)
+    def flow():
+        yield Spelet2.PauseScene(100)
+        yield Spelet2.MessageScene([("Klar", 36, 100)])
+    pygame.event.clear()
+    runtime.start(flow())
+    while not isinstance(runtime.scene, Spelet2.MessageScene):
+        runtime.frame()
+    idle_before = runtime.idle_frames
+    start = time.perf_counter()
+    frames = 0
+    while runtime.needs_draw and frames < 10:
+        runtime.frame()
+        frames += 1
+    return frames, runtime.idle_frames > idle_before, (time.perf_counter() - start) * 1000
+
+# ------------------------------
+# Spelmotorn
+# ------------------------------
+def _best(func, repeat=REPEAT):
+    return min(_timed(func) for _ in range(repeat))
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def bench_hand_value(calls=200_000):
+    rng = random.Random(1)
+    deck = engine.Shoe(rng=rng)
+    hands = []
+    for _ in range(1000):
+        hand = engine.Hand()
+        for _ in range(rng.randint(2, 5)):
+            hand.add_card(deck.deal_card())
+        hands.append(hand)
+    repeats = calls // len(hands)
+    def run():
+        for _ in range(repeats):
+            for hand in hands:
+                hand.get_value()
+    return {"value": repeats * len(hands) / _best(run), "unit": "calls/s"}
+
+def bench_deck_create(decks=5000):
+    rng = random.Random(1)
+    def run():
+        for _ in range(decks):
+            engine.Deck(rng=rng)
+    return {"value": decks / _best(run), "unit": "decks/s"}
+
+def bench_deal(cards=500_000):
+    shoe = engine.Shoe(rng=random.Random(1))
+    def run():
+        for _ in range(cards):
+            shoe.deal_card()
+    return {"value": cards / _best(run), "unit": "cards/s"}
+
+def bench_rounds(rounds=50_000):
+    policy = engine.StandOn()
+    def run():
+        engine.run_rounds(rounds, policy, seed=1)
+    return {"value": rounds / _best(run), "unit": "rounds/s"}
+
+def bench_simulation(rounds=1_000_000):
+    policy = engine.StandOn()
+    def run():
+        simulation.simulate(rounds, policy, seed=1)
+    return {"value": rounds / _best(run), "unit": "rounds/s"}
+
+ENGINE = {
+    "hand_get_value": bench_hand_value,
+    "deck_create": bench_deck_create,
+    "shoe_deal": bench_deal,
+    "engine_rounds": bench_rounds,
+    "simulation_rounds": bench_simulation,
+}
+
+def run_all(frames=DEFAULT_FRAMES, only=None):
+    results = {}
+    if only in (None, "scenes"):
+        Spelet2.init_display()
+        Spelet2.player_name, Spelet2.opponent_name = "Bänk", "Mats"
+        for name in SCREENS:
+            results[f"scene.{name}"] = bench_screen(name, frames)
+    if only in (None, "engine"):
+        for name, bench in ENGINE.items():
+            results[f"engine.{name}"] = bench()
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+    }
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Mätningar som blivit mer än tolerance långsammare än baslinjen."""
+    regressions = {}
+    for name, old in baseline["results"].items():
+        new = results.get(name)
+        if new is None or not old["value"]:
+            continue
+        ratio = new["value"] / old["value"]
+        if ratio < 1 - tolerance:
+            regressions[name] = ratio
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prestandamätningar utan fönster (SDL_VIDEODRIVER=dummy)")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="bildrutor per skärm")
+    parser.add_argument("--only", choices=("scenes", "engine"), default=None)
+    parser.add_argument("--save", nargs="?", const=BASELINE_PATH, default=None,
+                        help="spara resultaten som baslinje")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_PATH, default=None,
+                        help="jämför mot en sparad baslinje; avslutar med kod 1 vid regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+    results = run_all(args.frames, args.only)
+    for name, result in results.items():
+        extra = ""
+        if "peak_kb" in result:
+            extra = (f"  {result['ms_per_frame']:.2f} ms/bildruta  topp {result['peak_kb']:.0f} kB"
+                     f"  kvar {result['retained_kb']:.0f} kB  textcache {result['text_cache_hit_rate']:.0%}")
+            if result["retained_frames"]:
+                # Bara retained-scener ritas via renderaren
+                extra += f"  omritat {result['fill_ratio']:.0%}"
+        print(f"{name:28s} {result['value']:>14,.0f} {result['unit']}{extra}")
+    status = 0
+    if args.only in (None, "scenes"):
+        frames, waited, ms = check_first_draw()
+        print(f"Första ritningen efter scenbyte: {frames} bildruta(or), {ms:.1f} ms")
+        if frames > 1 or waited:
+            print("FEL: runtime:n väntade på input innan den nya scenen ritades")
+            status = 1
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, ratio in regressions.items():
+            print(f"REGRESSION {name}: {ratio:.0%} av baslinjen")
+        if regressions:
+            status = 1
+        else:
+            print("Inga regressioner")
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"Baslinje sparad i {args.save}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import engine
+import server
+
+# ------------------------------
+# Huvudlösa botar för lasttest av server.py
+# ------------------------------
+# Varje bot ansluter, satsar och spelar som StandOn (tar kort under gränsen)
+# och mäter tiden från att en begäran skickas tills svaret kommit.
+
+class Bot:
+    def __init__(self, name, bet=10, stand_on=engine.DEALER_STANDS_ON, think=0.0):
+        self.name = name
+        self.think = think  # sekunder mellan begäranden, som en människa
+        self.bet = bet
+        self.stand_on = stand_on
+        self.latencies = []  # sekunder per spelhandling (bet/hit/stand)
+        self.join_latency = None
+        self.rounds = 0
+        self.errors = 0
+        self.reader = None
+        self.writer = None
+    async def request(self, record=True, **message):
+        if self.think:
+            # Spridning så att botarna inte skickar i takt med varandra
+            await asyncio.sleep(self.think * random.uniform(0.5, 1.5))
+        start = time.perf_counter()
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        line = await self.reader.readline()
+        if record:
+            self.latencies.append(time.perf_counter() - start)
+        else:
+            self.join_latency = time.perf_counter() - start
+        if not line:
+            raise ConnectionError("servern stängde anslutningen")
+        reply = json.loads(line)
+        if not reply["ok"]:
+            self.errors += 1
+        return reply
+    async def play(self, host, port, rounds):
+        self.reader, self.writer = await asyncio.open_connection(host, port, limit=server.MAX_LINE)
+        try:
+            reply = await self.request(record=False, op="join", name=self.name)
+            money = reply["money"]
+            for _ in range(rounds):
+                reply = await self.request(op="bet", amount=min(self.bet, money))
+                value = reply["value"]
+                while value < self.stand_on:
+                    reply = await self.request(op="hit")
+                    value = reply["value"]
+                    if "result" in reply:
+                        break
+                if "result" not in reply:
+                    reply = await self.request(op="stand")
+                money = reply["money"]
+                self.rounds += 1
+                if "game_over" in reply["events"]:
+                    return
+            await self.request(record=False, op="quit")
+        finally:
+            self.writer.close()
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class LoadReport:
+    """Latens per spelhandling (ms) och genomströmning för en lasttestkörning.
+
+    Anslutning och join mäts för sig, eftersom de hamnar i kö när alla
+    botar ansluter på en gång.
+    """
+    def __init__(self, bots, elapsed):
+        self.sessions = len(bots)
+        self.latencies = sorted(latency for bot in bots for latency in bot.latencies)
+        self.join_latencies = sorted(bot.join_latency for bot in bots if bot.join_latency is not None)
+        self.rounds = sum(bot.rounds for bot in bots)
+        self.errors = sum(bot.errors for bot in bots)
+        self.elapsed = elapsed
+    def to_dict(self):
+        ms = [latency * 1000 for latency in self.latencies]
+        return {
+            "sessions": self.sessions,
+            "actions": len(ms),
+            "rounds": self.rounds,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "actions_per_second": len(ms) / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": percentile(ms, 0.50),
+            "p99_ms": percentile(ms, 0.99),
+            "max_ms": ms[-1] if ms else 0.0,
+            "join_p99_ms": percentile(self.join_latencies, 0.99) * 1000,
+        }
+    def __str__(self):
+        d = self.to_dict()
+        return (f"{d['sessions']} sessioner, {d['rounds']:,} rundor, {d['actions']:,} handlingar "
+                f"({d['actions_per_second']:,.0f}/s, {d['errors']} fel)\n"
+                f"latens p50 {d['p50_ms']:.2f} ms  p99 {d['p99_ms']:.2f} ms  max {d['max_ms']:.2f} ms"
+                f"  (join p99 {d['join_p99_ms']:.2f} ms)")
+
+async def load_test(host, port, sessions, rounds, bet=10, think=0.0, ramp=0.0, connect_batch=100):
+    """Kör sessions botar samtidigt; de ansluter connect_batch åt gången under ramp sekunder."""
+    bots = [Bot(f"bot{i}", bet, think=think) for i in range(sessions)]
+    start = time.perf_counter()
+    tasks = []
+    batches = max(1, -(-sessions // connect_batch))
+    for i in range(0, sessions, connect_batch):
+        tasks.extend(asyncio.create_task(bot.play(host, port, rounds)) for bot in bots[i:i + connect_batch])
+        await asyncio.sleep(ramp / batches)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = [r for r in results if isinstance(r, Exception)]
+    report = LoadReport(bots, elapsed)
+    report.errors += len(failures)
+    return report
+
+async def run_local(sessions, rounds, bet, think, ramp, seed):
+    """Startar en server i samma process på en ledig port och kör lasttestet mot den."""
+    game_server = server.GameServer(seed=seed)
+    port = await game_server.start(server.DEFAULT_HOST, 0)
+    try:
+        return await load_test(server.DEFAULT_HOST, port, sessions, rounds, bet, think, ramp)
+    finally:
+        await game_server.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lasttest av blackjackservern med huvudlösa botar")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20, help="rundor per session")
+    parser.add_argument("--bet", type=int, default=10)
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="ms paus före varje begäran (0 = så fort som möjligt)")
+    parser.add_argument("--ramp", type=float, default=0.0,
+                        help="sekunder att sprida ut anslutningarna över")
+    parser.add_argument("--host", default=server.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=None,
+                        help="anslut till en körande server; utan --port startas en i samma process")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="skriv rapporten som JSON")
+    args = parser.parse_args(argv)
+    if args.port is None:
+        report = asyncio.run(run_local(args.sessions, args.rounds, args.bet, args.think / 1000,
+                                       args.ramp, args.seed))
+    else:
+        report = asyncio.run(load_test(args.host, args.port, args.sessions, args.rounds, args.bet,
+                                       args.think / 1000, args.ramp))
+    print(json.dumps(report.to_dict(), indent=2) if args.json else report)
+    return 1 if report.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,174 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import engine
+import simulation
+
+# ------------------------------
+# Stresstest av ekonomin i main(): många hela sessioner sida vid sida
+# ------------------------------
+# En runda i main() gör i tur och ordning: insats (högst det man har),
+# vinst/förlust, huset i Texas vid HOUSE_THRESHOLD, hyra varje runda när
+# man har huset, och vid 0 kr armbrytning -> lån på LOAN_AMOUNT eller game over.
+
+class FixedBet:
+    """Satsar samma belopp varje runda (eller allt man har om det är mindre)."""
+    def __init__(self, amount=100):
+        self.amount = amount
+    def bets(self, money):
+        return np.full_like(money, self.amount)
+
+class FractionBet:
+    """Satsar en andel av pengarna, minst minimum kr."""
+    def __init__(self, fraction=0.1, minimum=10):
+        self.fraction = fraction
+        self.minimum = minimum
+    def bets(self, money):
+        return np.maximum((money * self.fraction).astype(money.dtype), self.minimum)
+
+class EconomyRules:
+    """Konstanterna som styr ekonomin, så att de kan justeras per körning."""
+    def __init__(self, start_money=engine.START_MONEY, house_threshold=engine.HOUSE_THRESHOLD,
+                 rent=engine.RENT, loan_amount=engine.LOAN_AMOUNT, loan_chance=1.0):
+        self.start_money = start_money
+        self.house_threshold = house_threshold
+        self.rent = rent
+        self.loan_amount = loan_amount
+        # Sannolikheten att vinna armbrytningen och få lånet
+        self.loan_chance = loan_chance
+
+class SessionReport:
+    """Per session: rundor till ruin/game over/hus (-1 = hände aldrig), antal lån och slutsaldo.
+
+    Ruin är första rundan pengarna tog slut (0 kr eller mindre), oavsett om
+    ett lån räddade sessionen; game over är när armbrytningen förlorades.
+    """
+    def __init__(self, time_to_ruin, time_to_game_over, time_to_house, loans, final_money,
+                 max_rounds, elapsed):
+        self.time_to_ruin = time_to_ruin
+        self.time_to_game_over = time_to_game_over
+        self.time_to_house = time_to_house
+        self.loans = loans
+        self.final_money = final_money
+        self.max_rounds = max_rounds
+        self.elapsed = elapsed
+    @property
+    def sessions(self):
+        return self.loans.size
+    @staticmethod
+    def _distribution(values):
+        hit = values[values >= 0]
+        summary = {"fraction": hit.size / values.size if values.size else 0.0}
+        if hit.size:
+            p10, p50, p90, p99 = np.percentile(hit, [10, 50, 90, 99])
+            summary.update({"mean": float(hit.mean()), "p10": float(p10), "p50": float(p50),
+                            "p90": float(p90), "p99": float(p99)})
+        return summary
+    def summary(self):
+        loan_histogram = np.bincount(self.loans)
+        return {
+            "sessions": self.sessions,
+            "max_rounds": self.max_rounds,
+            "ruin": self._distribution(self.time_to_ruin),
+            "game_over": self._distribution(self.time_to_game_over),
+            "house": self._distribution(self.time_to_house),
+            "loans": {
+                "mean": float(self.loans.mean()) if self.sessions else 0.0,
+                "fraction_with_loan": float((self.loans > 0).mean()) if self.sessions else 0.0,
+                "histogram": loan_histogram.tolist(),
+            },
+            "final_money_p50": float(np.median(self.final_money)) if self.sessions else 0.0,
+            "elapsed": self.elapsed,
+        }
+
+def _play_rounds(n, policy, rng, batch_size):
+    # play_batch lägger upp en hel sko per runda, så stora n delas upp i omgångar
+    if n <= batch_size:
+        return simulation.play_batch(n, policy, rng)
+    return np.concatenate([simulation.play_batch(min(batch_size, n - i), policy, rng)
+                           for i in range(0, n, batch_size)])
+
+def simulate_sessions(sessions, max_rounds=1000, bet_policy=None, play_policy=None,
+                      rules=None, seed=None, rng=None, batch_size=simulation.DEFAULT_BATCH):
+    """Spelar upp till max_rounds rundor i varje session, alla sessioner samtidigt."""
+    if bet_policy is None:
+        bet_policy = FixedBet()
+    if play_policy is None:
+        play_policy = engine.StandOn()
+    if rules is None:
+        rules = EconomyRules()
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    money = np.full(sessions, rules.start_money, dtype=np.int64)
+    has_house = np.zeros(sessions, dtype=bool)
+    alive = np.ones(sessions, dtype=bool)
+    time_to_ruin = np.full(sessions, -1, dtype=np.int32)
+    time_to_game_over = np.full(sessions, -1, dtype=np.int32)
+    time_to_house = np.full(sessions, -1, dtype=np.int32)
+    loans = np.zeros(sessions, dtype=np.int32)
+    payout_table = np.array([engine.PAYOUTS[code] for code in sorted(engine.PAYOUTS)], dtype=np.int64)
+
+    for round_no in range(1, max_rounds + 1):
+        rows = np.flatnonzero(alive)
+        if rows.size == 0:
+            break
+        cash = money[rows]
+        # betting_screen() tillåter bara insatser mellan 1 och det man har
+        bets = np.clip(bet_policy.bets(cash), 1, cash)
+        codes = _play_rounds(rows.size, play_policy, rng, batch_size)
+        cash = cash + payout_table[codes] * bets
+
+        buys = ~has_house[rows] & (cash >= rules.house_threshold)
+        has_house[rows[buys]] = True
+        time_to_house[rows[buys]] = round_no
+        cash = cash - np.where(has_house[rows], rules.rent, 0)
+
+        broke = cash <= 0
+        if broke.any():
+            first = rows[broke][time_to_ruin[rows[broke]] < 0]
+            time_to_ruin[first] = round_no
+            wins_arm = rng.random(rows.size) < rules.loan_chance
+            loaned = broke & wins_arm
+            ruined = broke & ~wins_arm
+            cash[loaned] = rules.loan_amount
+            loans[rows[loaned]] += 1
+            alive[rows[ruined]] = False
+            time_to_game_over[rows[ruined]] = round_no
+        money[rows] = cash
+
+    return SessionReport(time_to_ruin, time_to_game_over, time_to_house, loans, money, max_rounds,
+                         time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stresstest av spelets ekonomi över många sessioner")
+    parser.add_argument("sessions", type=int, nargs="?", default=100_000)
+    parser.add_argument("--rounds", type=int, default=500, help="max antal rundor per session")
+    parser.add_argument("--bet", type=int, default=100, help="fast insats per runda")
+    parser.add_argument("--bet-fraction", type=float, default=None, help="satsa en andel av pengarna i stället")
+    parser.add_argument("--stand-on", type=int, default=engine.DEALER_STANDS_ON)
+    parser.add_argument("--start-money", type=int, default=engine.START_MONEY)
+    parser.add_argument("--house-threshold", type=int, default=engine.HOUSE_THRESHOLD)
+    parser.add_argument("--rent", type=int, default=engine.RENT)
+    parser.add_argument("--loan-amount", type=int, default=engine.LOAN_AMOUNT)
+    parser.add_argument("--loan-chance", type=float, default=1.0,
+                        help="sannolikhet att vinna armbrytningen")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    bet_policy = FractionBet(args.bet_fraction) if args.bet_fraction else FixedBet(args.bet)
+    rules = EconomyRules(args.start_money, args.house_threshold, args.rent, args.loan_amount, args.loan_chance)
+    report = simulate_sessions(args.sessions, args.rounds, bet_policy, engine.StandOn(args.stand_on),
+                               rules, seed=args.seed)
+    summary = report.summary()
+    for key in ("ruin", "game_over", "house"):
+        print(f"{key}: {summary[key]}")
+    loans = summary["loans"]
+    print(f"lån: snitt {loans['mean']:.3f}, andel med lån {loans['fraction_with_loan']:.3f}, "
+          f"fördelning {loans['histogram'][:10]}")
+    print(f"{summary['sessions']} sessioner på {summary['elapsed']:.2f} s")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
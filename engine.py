@@ -0,0 +1,326 @@
+import random
+from array import array
+
+# ------------------------------
+# Spelmotor för blackjack (helt utan pygame)
+# ------------------------------
+SUITS = ['♥', '♦', '♣', '♠']
+RANKS = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+
+BLACKJACK = 21
+DEALER_STANDS_ON = 17
+
+# Resultatkoder för en avgjord runda
+PLAYER_BUST = 0
+DEALER_WIN  = 1
+PUSH        = 2
+PLAYER_WIN  = 3
+DEALER_BUST = 4
+
+RESULT_NAMES = {
+    PLAYER_BUST: "player_bust",
+    DEALER_WIN:  "dealer_win",
+    PUSH:        "push",
+    PLAYER_WIN:  "player_win",
+    DEALER_BUST: "dealer_bust",
+}
+
+# Ekonomin i main(): startkapital, huset i Texas, hyra och lånet vid ruin
+START_MONEY     = 1000
+HOUSE_THRESHOLD = 3000
+RENT            = 75
+LOAN_AMOUNT     = 500
+
+# Skon som används vid bordet: antal kortlekar och hur långt in klippkortet ligger
+SHOE_DECKS       = 6
+SHOE_PENETRATION = 0.75
+
+# Vinst/förlust i antal insatser per resultat
+PAYOUTS = {
+    PLAYER_BUST: -1,
+    DEALER_WIN:  -1,
+    PUSH:         0,
+    PLAYER_WIN:   1,
+    DEALER_BUST:  1,
+}
+
+# ------------------------------
+# Kort, kortlek och hand
+# ------------------------------
+# Varje kort har en liten heltalskod: färg * 13 + valör (0-51)
+RANK_VALUES = [11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10]
+
+def card_code(suit, rank):
+    return SUITS.index(suit) * len(RANKS) + RANKS.index(rank)
+
+class Card:
+    __slots__ = ('suit', 'rank', 'code', 'value')
+    def __init__(self, suit, rank):
+        self.suit = suit
+        self.rank = rank
+        self.code = card_code(suit, rank)
+        self.value = RANK_VALUES[self.code % len(RANKS)]
+    def get_value(self):
+        return self.value
+    def __repr__(self):
+        return f"Card({self.suit!r}, {self.rank!r})"
+
+# ------------------------------
+# Korträkning
+# ------------------------------
+class CountSystem:
+    """Ett räknesystem: en tagg per valör (A, 2-10, J, Q, K i RANKS-ordning).
+
+    Obalanserade system (taggarna summerar inte till 0 per kortlek) startar
+    på initial_count per kortlek utöver den första, så att räkningen i snitt når 0
+    när en kortlek är kvar. KO har -4: 0 med en kortlek, -20 med sex.
+    """
+    def __init__(self, name, tags, initial_count=0):
+        if len(tags) != len(RANKS):
+            raise ValueError("en tagg per valör behövs")
+        self.name = name
+        self.tags = tuple(tags)
+        self.initial_count = initial_count
+    @classmethod
+    def by_value(cls, name, ace, twos_to_nines, tens, initial_count=0):
+        """Bygger taggarna från ess, 2-9 och alla tiovärda kort."""
+        return cls(name, (ace,) + tuple(twos_to_nines) + (tens,) * 4, initial_count)
+    def initial(self, decks):
+        return self.initial_count * (decks - 1)
+
+HI_LO    = CountSystem.by_value("Hi-Lo", -1, (1, 1, 1, 1, 1, 0, 0, 0), -1)
+HI_OPT_I = CountSystem.by_value("Hi-Opt I", 0, (0, 1, 1, 1, 1, 0, 0, 0), -1)
+KO       = CountSystem.by_value("KO", -1, (1, 1, 1, 1, 1, 1, 0, 0), -1, initial_count=-4)
+OMEGA_II = CountSystem.by_value("Omega II", 0, (1, 1, 2, 2, 2, 1, 0, -1), -2)
+
+class Shoe:
+    """En sko med flera kortlekar och ett klippkort.
+
+    Korten ligger som kortkoder (0-51) i en förallokerad array som blandas
+    på plats, och varje kod pekar på ett delat Card-objekt. Att dela ut ett
+    kort är bara att flytta en position framåt.
+
+    Skon håller också löpande räkning för count_system och antal kvar per
+    valör; båda uppdateras med en tabelluppslagning per utdelat kort.
+    """
+    card_class = Card
+    def __init__(self, decks=SHOE_DECKS, penetration=SHOE_PENETRATION, rng=None, count_system=HI_LO):
+        # rng är en egen random.Random för reproducerbara körningar,
+        # annars används den globala random-modulen som tidigare
+        self.rng = rng if rng is not None else random
+        self.decks = decks
+        self.faces = [self.card_class(suit, rank) for suit in SUITS for rank in RANKS]
+        self.codes = array('B', range(len(self.faces))) * decks
+        self.size = len(self.codes)
+        self.cut = max(1, int(self.size * penetration))
+        self.position = 0
+        self.count_system = count_system
+        # Tagg och valörindex per kortkod, så att deal_card() slipper räkna
+        self._tags = [count_system.tags[code % len(RANKS)] for code in range(len(self.faces))]
+        self._ranks = [code % len(RANKS) for code in range(len(self.faces))]
+        self.shuffle()
+    def shuffle(self):
+        self.rng.shuffle(self.codes)
+        self.position = 0
+        self.running_count = self.count_system.initial(self.decks)
+        self.rank_counts = [len(SUITS) * self.decks] * len(RANKS)
+    @property
+    def remaining(self):
+        return self.size - self.position
+    @property
+    def cards(self):
+        return [self.faces[code] for code in self.codes[self.position:]]
+    @property
+    def decks_remaining(self):
+        return (self.size - self.position) / (len(SUITS) * len(RANKS))
+    @property
+    def true_count(self):
+        """Löpande räkning per kvarvarande kortlek."""
+        decks = self.decks_remaining
+        return self.running_count / decks if decks else 0.0
+    def count_for(self, system):
+        """Löpande räkning i ett annat system, från antal kvar per valör (O(13))."""
+        full = len(SUITS) * self.decks
+        return system.initial(self.decks) + sum(tag * (full - left) for tag, left in zip(system.tags, self.rank_counts))
+    def composition(self):
+        """Kvarvarande kort per värde i odds-modulens ordning: ess, 2-9, tior."""
+        counts = self.rank_counts
+        return tuple(counts[:9]) + (sum(counts[9:]),)
+    @property
+    def needs_shuffle(self):
+        return self.position >= self.cut
+    def start_round(self):
+        """Blandar om skon mellan rundor när klippkortet har passerats."""
+        if self.needs_shuffle:
+            self.shuffle()
+    def deal_card(self):
+        position = self.position
+        if position >= self.size:
+            self.shuffle()
+            position = 0
+        self.position = position + 1
+        code = self.codes[position]
+        self.running_count += self._tags[code]
+        self.rank_counts[self._ranks[code]] -= 1
+        return self.faces[code]
+
+class Deck(Shoe):
+    """En enda kortlek som blandas om först när den är slut."""
+    def __init__(self, rng=None, count_system=HI_LO):
+        super().__init__(decks=1, penetration=1.0, rng=rng, count_system=count_system)
+
+class Hand:
+    """Håller en löpande hård summa (ess = 1) och antal ess, så get_value() är O(1)."""
+    __slots__ = ('cards', 'hard', 'aces')
+    def __init__(self):
+        self.cards = []
+        self.hard = 0
+        self.aces = 0
+    def add_card(self, card):
+        self.cards.append(card)
+        if card.value == 11:
+            self.hard += 1
+            self.aces += 1
+        else:
+            self.hard += card.value
+    @property
+    def is_soft(self):
+        # Högst ett ess kan räknas som 11 utan att handen går över 21
+        return self.aces > 0 and self.hard + 10 <= BLACKJACK
+    def get_value(self):
+        if self.aces and self.hard + 10 <= BLACKJACK:
+            return self.hard + 10
+        return self.hard
+    def is_bust(self):
+        return self.hard > BLACKJACK
+
+# ------------------------------
+# Regler för dealern och avgörande av rundan
+# ------------------------------
+def dealer_should_hit(dealer_hand):
+    return dealer_hand.get_value() < DEALER_STANDS_ON
+
+def resolve(player_hand, dealer_hand):
+    """Jämför händerna och returnerar en resultatkod."""
+    player_val = player_hand.get_value()
+    dealer_val = dealer_hand.get_value()
+    if player_val > BLACKJACK:
+        return PLAYER_BUST
+    elif dealer_val > BLACKJACK:
+        return DEALER_BUST
+    elif dealer_val > player_val:
+        return DEALER_WIN
+    elif dealer_val < player_val:
+        return PLAYER_WIN
+    else:
+        return PUSH
+
+def payout(result, bet):
+    """Hur mycket spelarens pengar ändras för en insats."""
+    return PAYOUTS[result] * bet
+
+class Round:
+    """En runda som styrs steg för steg, t.ex. av UI:t."""
+    def __init__(self, deck, hand_class=Hand):
+        self.deck = deck
+        deck.start_round()
+        self.player_hand = hand_class()
+        self.dealer_hand = hand_class()
+        self.player_hand.add_card(deck.deal_card())
+        self.player_hand.add_card(deck.deal_card())
+        self.dealer_hand.add_card(deck.deal_card())
+        self.dealer_hand.add_card(deck.deal_card())
+        self.player_turn = True
+        self.result = None
+    @property
+    def done(self):
+        return self.result is not None
+    def hit(self):
+        card = self.deck.deal_card()
+        self.player_hand.add_card(card)
+        if self.player_hand.is_bust():
+            self.player_turn = False
+            self.result = PLAYER_BUST
+        return card
+    def stand(self):
+        self.player_turn = False
+    def dealer_needs_card(self):
+        return not self.player_turn and self.result is None and dealer_should_hit(self.dealer_hand)
+    def dealer_draw(self):
+        card = self.deck.deal_card()
+        self.dealer_hand.add_card(card)
+        return card
+    def finish(self):
+        while self.dealer_needs_card():
+            self.dealer_draw()
+        if self.result is None:
+            self.result = resolve(self.player_hand, self.dealer_hand)
+        return self.result
+    def payout(self, bet):
+        return payout(self.result, bet)
+
+# ------------------------------
+# Ekonomin efter en avgjord runda
+# ------------------------------
+def settle(money, has_house, payout, won_arm_wrestle=False, rules=None):
+    """Pengar och hus efter rundan, i samma ordning som i spelet.
+
+    Utbetalning, huset i Texas vid HOUSE_THRESHOLD, hyra varje runda med
+    huset, och vid 0 kr eller mindre lån (won_arm_wrestle) eller game over.
+    rules är ett objekt med house_threshold, rent och loan_amount (t.ex.
+    economy.EconomyRules); utan rules gäller konstanterna ovan.
+
+    Returnerar (pengar, har hus, händelser) där händelserna är "house",
+    "rent" och "loan" eller "game_over", i den ordningen.
+    """
+    if rules is None:
+        house_threshold, rent, loan_amount = HOUSE_THRESHOLD, RENT, LOAN_AMOUNT
+    else:
+        house_threshold, rent, loan_amount = rules.house_threshold, rules.rent, rules.loan_amount
+    money += payout
+    events = []
+    if not has_house and money >= house_threshold:
+        has_house = True
+        events.append("house")
+    if has_house:
+        money -= rent
+        events.append("rent")
+    if money <= 0:
+        if won_arm_wrestle:
+            money = loan_amount
+            events.append("loan")
+        else:
+            events.append("game_over")
+    return money, has_house, events
+
+# ------------------------------
+# Spelarstrategier och snabb huvudlös simulering
+# ------------------------------
+class StandOn:
+    """Tar kort tills handen når gränsen (som dealern gör på 17)."""
+    def __init__(self, threshold=DEALER_STANDS_ON):
+        self.threshold = threshold
+    def __call__(self, player_hand, dealer_upcard):
+        return player_hand.get_value() < self.threshold
+    def hit_mask(self, totals, soft, upcards):
+        # Samma regel för hela arrayer i simulation.py
+        return totals < self.threshold
+
+def play_round(deck, policy):
+    """Spelar en hel runda utan fönster och returnerar den avgjorda Round:en."""
+    round_ = Round(deck)
+    upcard = round_.dealer_hand.cards[1]
+    while round_.player_turn and policy(round_.player_hand, upcard):
+        round_.hit()
+    round_.stand()
+    round_.finish()
+    return round_
+
+def run_rounds(rounds, policy, deck=None, seed=None):
+    """Spelar många rundor och räknar resultaten per resultatkod."""
+    if deck is None:
+        deck = Shoe(rng=random.Random(seed) if seed is not None else None)
+    counts = dict.fromkeys(RESULT_NAMES, 0)
+    for _ in range(rounds):
+        counts[play_round(deck, policy).result] += 1
+    return counts
@@ -0,0 +1,177 @@
+import argparse
+import os
+import struct
+import sys
+import time
+
+import engine
+
+# ------------------------------
+# Binär journal över spelade rundor
+# ------------------------------
+# Filen börjar med ett huvud (magi, version, poststorlek) och följs av poster
+# med fast storlek. Kort lagras som kortkoder (0-51) och tomma platser som
+# NO_CARD. En hand med fler än MAX_CARDS kort (bara möjligt med många ess i
+# skon) sparas med de första MAX_CARDS korten men rätt antal.
+JOURNAL_VERSION = 1
+MAGIC = b"BJRJ"
+HEADER = struct.Struct("<4sHH")
+MAX_CARDS = 12
+NO_CARD = 0xFF
+RECORD = struct.Struct(f"<dIiiBBB{MAX_CARDS}s{MAX_CARDS}sx")
+BUFFER_RECORDS = 256
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "rounds.bjr")
+
+def record_dtype():
+    """NumPy-typen för en post, fält för fält samma som RECORD."""
+    import numpy as np
+    return np.dtype([
+        ("time", "<f8"),
+        ("round", "<u4"),
+        ("bet", "<i4"),
+        ("bankroll", "<i4"),
+        ("result", "u1"),
+        ("player_count", "u1"),
+        ("dealer_count", "u1"),
+        ("player_cards", "u1", (MAX_CARDS,)),
+        ("dealer_cards", "u1", (MAX_CARDS,)),
+        ("pad", "V1"),
+    ])
+
+def _cards(hand):
+    return bytes(card.code for card in hand.cards[:MAX_CARDS]).ljust(MAX_CARDS, bytes([NO_CARD]))
+
+class RoundJournal:
+    """Lägger till en post per avgjord runda i en buffrad fil.
+
+    Filen öppnas först vid första append(), så att skapa journalen har
+    inga sidoeffekter. Poster samlas i en förallokerad buffert och skrivs
+    BUFFER_RECORDS åt gången (och vid flush()/close()).
+    """
+    def __init__(self, path=DEFAULT_PATH, buffer_records=BUFFER_RECORDS):
+        self.path = path
+        self.buffer_records = buffer_records
+        self.buffer = bytearray(RECORD.size * buffer_records)
+        self.pending = 0
+        self.rounds = None
+        self.file = None
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, "ab")
+        size = self.file.tell()
+        if size < HEADER.size:
+            # Ny fil, eller en krasch medan huvudet skrevs
+            self.file.truncate(0)
+            self.file.write(HEADER.pack(MAGIC, JOURNAL_VERSION, RECORD.size))
+            self.rounds = 0
+        else:
+            with open(self.path, "rb") as f:
+                _check_header(f.read(HEADER.size))
+            # En halvskriven sista post (t.ex. efter en krasch) skärs bort, så
+            # att nya poster hamnar på rätt plats
+            self.rounds = (size - HEADER.size) // RECORD.size
+            self.file.truncate(HEADER.size + self.rounds * RECORD.size)
+    def append(self, round_, bet, bankroll, timestamp=None):
+        """Sparar en avgjord runda; bankroll är pengarna när rundan är klar (efter hyra och lån)."""
+        if self.file is None:
+            self._open()
+        RECORD.pack_into(self.buffer, self.pending * RECORD.size,
+                         time.time() if timestamp is None else timestamp,
+                         self.rounds, bet, bankroll, round_.result,
+                         min(len(round_.player_hand.cards), 255), min(len(round_.dealer_hand.cards), 255),
+                         _cards(round_.player_hand), _cards(round_.dealer_hand))
+        self.rounds += 1
+        self.pending += 1
+        if self.pending == self.buffer_records:
+            self.flush()
+    def flush(self):
+        if self.pending:
+            self.file.write(memoryview(self.buffer)[:self.pending * RECORD.size])
+            self.pending = 0
+        if self.file is not None:
+            self.file.flush()
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+
+def _check_header(data):
+    try:
+        magic, version, record_size = HEADER.unpack(data)
+    except struct.error:
+        raise ValueError("ogiltig rundjournal") from None
+    if magic != MAGIC or version != JOURNAL_VERSION or record_size != RECORD.size:
+        raise ValueError("ogiltig rundjournal")
+
+def read_journal(path=DEFAULT_PATH):
+    """Hela journalen som en minnesmappad NumPy-strukturerad array.
+
+    Inget läses in i förväg; kolumner som records["result"] läses från
+    filen när de används.
+    """
+    import numpy as np
+    size = os.path.getsize(path)
+    if size >= HEADER.size:
+        with open(path, "rb") as f:
+            _check_header(f.read(HEADER.size))
+    # Kortare än huvudet: kraschade innan något skrevs, alltså tom
+    count = max(0, (size - HEADER.size) // RECORD.size)
+    if count == 0:
+        return np.zeros(0, dtype=record_dtype())
+    return np.memmap(path, dtype=record_dtype(), mode="r", offset=HEADER.size, shape=(count,))
+
+def summarize(records):
+    """Antal rundor, fördelning per resultat och snittvinst per satsad krona."""
+    import numpy as np
+    counts = np.bincount(records["result"], minlength=len(engine.RESULT_NAMES))
+    payouts = np.array([engine.PAYOUTS[code] for code in sorted(engine.PAYOUTS)], dtype=np.int64)
+    bets = records["bet"].astype(np.int64)
+    won = (payouts[records["result"]] * bets).sum()
+    wagered = bets.sum()
+    return {
+        "rounds": int(len(records)),
+        "results": {engine.RESULT_NAMES[code]: int(n) for code, n in enumerate(counts)},
+        "return_per_bet": float(won / wagered) if wagered else 0.0,
+        "mean_dealer_draws": float((records["dealer_count"].astype(np.int64) - 2).mean()) if len(records) else 0.0,
+    }
+
+def record_rounds(path, rounds, policy, bet=10, seed=None):
+    """Spelar rundor med motorn och sparar dem, t.ex. för att testa analyser."""
+    import random
+    deck = engine.Shoe(rng=random.Random(seed) if seed is not None else None)
+    bankroll = engine.START_MONEY
+    with RoundJournal(path, buffer_records=4096) as journal:
+        for _ in range(rounds):
+            round_ = engine.play_round(deck, policy)
+            bankroll += round_.payout(bet)
+            journal.append(round_, bet, bankroll)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Läs eller fyll på en binär rundjournal")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    parser.add_argument("--simulate", type=int, default=0, metavar="ROUNDS",
+                        help="spela så många rundor med motorn och lägg till dem först")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.simulate:
+        start = time.perf_counter()
+        record_rounds(args.path, args.simulate, engine.StandOn(), seed=args.seed)
+        print(f"{args.simulate:,} rundor skrivna på {time.perf_counter() - start:.1f} s")
+    start = time.perf_counter()
+    report = summarize(read_journal(args.path))
+    elapsed = time.perf_counter() - start
+    print(f"{report['rounds']:,} rundor ({elapsed * 1000:.0f} ms)")
+    for name, n in report["results"].items():
+        print(f"  {name:12s} {n:,}")
+    print(f"Avkastning per satsad krona: {report['return_per_bet']:+.4f}")
+    print(f"Dealerns dragna kort i snitt: {report['mean_dealer_draws']:.3f}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+import engine
+
+# ------------------------------
+# Exakta sannolikheter för dealerns slutsumma
+# ------------------------------
+# En sammansättning är en tuple med antal kvarvarande kort per värde:
+# index 0 = ess, 1-8 = 2-9, 9 = tior och klädda kort.
+OUTCOMES = (17, 18, 19, 20, 21, "bust")
+BUST = len(OUTCOMES) - 1
+CACHE_SIZE = 1 << 16
+
+def value_index(card_value):
+    """Index i sammansättningen för ett kortvärde (ess = 1 eller 11)."""
+    return 0 if card_value in (1, 11) else card_value - 1
+
+def full_composition(decks=1):
+    return tuple([4 * decks] * 9 + [16 * decks])
+
+def composition_of(cards, base=None):
+    """Räknar kort per värde, t.ex. de kort som finns kvar i en sko."""
+    counts = list(base) if base is not None else [0] * 10
+    for card in cards:
+        counts[value_index(card.value)] += 1
+    return tuple(counts)
+
+def remove_cards(composition, cards):
+    counts = list(composition)
+    for card in cards:
+        counts[value_index(card.value)] -= 1
+    return tuple(counts)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _dealer_from(hard, has_ace, composition):
+    total = hard + 10 if has_ace and hard + 10 <= engine.BLACKJACK else hard
+    result = [0.0] * len(OUTCOMES)
+    if total > engine.BLACKJACK:
+        result[BUST] = 1.0
+        return tuple(result)
+    if total >= engine.DEALER_STANDS_ON:
+        result[total - engine.DEALER_STANDS_ON] = 1.0
+        return tuple(result)
+    remaining = sum(composition)
+    if remaining == 0:
+        # Skon tar slut mitt i: dealern fortsätter från en ny kortlek
+        composition = full_composition()
+        remaining = sum(composition)
+    for i, count in enumerate(composition):
+        if not count:
+            continue
+        p = count / remaining
+        rest = composition[:i] + (count - 1,) + composition[i + 1:]
+        sub = _dealer_from(hard + i + 1, has_ace or i == 0, rest)
+        for k in range(len(OUTCOMES)):
+            result[k] += p * sub[k]
+    return tuple(result)
+
+def dealer_distribution(upcard, composition):
+    """Sannolikhet för varje slutsumma i OUTCOMES enligt regeln i dealer_turn().
+
+    upcard är dealerns synliga kort (ett Card eller ett värde 1-11) och
+    composition de kort som kan komma härnäst, inklusive det dolda kortet.
+    """
+    value = upcard.value if isinstance(upcard, engine.Card) else upcard
+    i = value_index(value)
+    return _dealer_from(i + 1, i == 0, tuple(composition))
+
+def as_dict(distribution):
+    return dict(zip(OUTCOMES, distribution))
+
+def cache_info():
+    return _dealer_from.cache_info()
+
+def cache_clear():
+    _dealer_from.cache_clear()
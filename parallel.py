@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import engine
+import simulation
+
+# ------------------------------
+# Simulering uppdelad på flera processer med deterministisk seedning
+# ------------------------------
+# Jobbet delas alltid i lika stora skärvor oberoende av antalet processer.
+# Varje skärva får en egen ström från SeedSequence(seed).spawn(), så
+# resultatet beror bara på (seed, rounds, shard_size) och inte på workers.
+DEFAULT_SHARD = 1 << 20
+
+def shard_sizes(rounds, shard_size=DEFAULT_SHARD):
+    full, rest = divmod(rounds, shard_size)
+    return [shard_size] * full + ([rest] if rest else [])
+
+def _run_shard(job):
+    rounds, policy, seed_seq, batch_size, decks = job
+    rng = np.random.default_rng(seed_seq)
+    result = simulation.simulate(rounds, policy, batch_size=batch_size, decks=decks, rng=rng)
+    return result.counts
+
+class ParallelReport:
+    """Sammanslaget resultat plus det som behövs för att köra om jobbet."""
+    def __init__(self, result, seed, shards, workers, elapsed):
+        self.result = result
+        self.seed = seed
+        self.shards = shards
+        self.workers = workers
+        self.elapsed = elapsed
+    @property
+    def rounds_per_second(self):
+        return self.result.rounds / self.elapsed if self.elapsed > 0 else 0.0
+    def to_dict(self):
+        report = self.result.to_dict()
+        report.update({
+            "seed": self.seed,
+            "shards": self.shards,
+            "workers": self.workers,
+            "elapsed": self.elapsed,
+            "rounds_per_second": self.rounds_per_second,
+        })
+        return report
+    def __repr__(self):
+        return (f"{self.result!r}\nseed={self.seed} shards={self.shards} workers={self.workers} "
+                f"{self.rounds_per_second:,.0f} rundor/s")
+
+def run_parallel(rounds, policy=None, seed=None, workers=None, shard_size=DEFAULT_SHARD,
+                 batch_size=simulation.DEFAULT_BATCH, decks=engine.SHOE_DECKS):
+    """Kör simulate() på en processpool och slår ihop skärvorna i ordning."""
+    if policy is None:
+        policy = engine.StandOn()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    root = np.random.SeedSequence(seed)
+    sizes = shard_sizes(rounds, shard_size)
+    jobs = [(n, policy, child, batch_size, decks) for n, child in zip(sizes, root.spawn(len(sizes)))]
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        shard_counts = [_run_shard(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            shard_counts = list(pool.map(_run_shard, jobs))
+    result = simulation.SimulationResult()
+    for counts in shard_counts:
+        result.merge(simulation.SimulationResult(counts))
+    return ParallelReport(result, root.entropy, len(jobs), workers, time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallell Monte Carlo-simulering av blackjackrundor")
+    parser.add_argument("rounds", type=int, nargs="?", default=10_000_000)
+    parser.add_argument("--stand-on", type=int, default=engine.DEALER_STANDS_ON)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD)
+    parser.add_argument("--decks", type=int, default=engine.SHOE_DECKS)
+    parser.add_argument("--basic-strategy", action="store_true",
+                        help="spela efter den förberäknade strategitabellen i stället för --stand-on")
+    args = parser.parse_args(argv)
+    if args.basic_strategy:
+        import strategy
+        policy = strategy.load_table()
+    else:
+        policy = engine.StandOn(args.stand_on)
+    report = run_parallel(args.rounds, policy, seed=args.seed,
+                          workers=args.workers, shard_size=args.shard_size, decks=args.decks)
+    print(report)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,53 @@
+import numpy as np
+import pygame
+
+# ------------------------------
+# Partikelsystem med förallokerade arrayer
+# ------------------------------
+class ParticleSystem:
+    """Upp till capacity partiklar som alla ritas med samma sprite.
+
+    Positioner och hastigheter (pixlar per sekund) ligger i NumPy-arrayer
+    som skapas en gång. En partikel som lämnar bounds markeras som död och
+    dess plats återanvänds av nästa spawn(), så inga listor byggs om.
+    Allt ritas med ett enda Surface.blits()-anrop.
+    """
+    def __init__(self, capacity, sprite, bounds):
+        self.capacity = capacity
+        self.sprite = sprite
+        self.bounds = pygame.Rect(bounds)
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.alive = np.zeros(capacity, dtype=bool)
+    @property
+    def count(self):
+        return int(np.count_nonzero(self.alive))
+    def spawn(self, x, y, vx, vy):
+        """Lägger till partiklar (skalärer eller arrayer); returnerar antalet.
+
+        Är poolen full skapas bara så många som får plats.
+        """
+        x, y, vx, vy = np.broadcast_arrays(x, y, vx, vy)
+        slots = np.flatnonzero(~self.alive)[:x.size]
+        n = slots.size
+        if n:
+            self.pos[slots, 0] = x.ravel()[:n]
+            self.pos[slots, 1] = y.ravel()[:n]
+            self.vel[slots, 0] = vx.ravel()[:n]
+            self.vel[slots, 1] = vy.ravel()[:n]
+            self.alive[slots] = True
+        return n
+    def update(self, dt):
+        """Flyttar alla levande partiklar dt ms och dödar dem utanför bounds."""
+        self.pos += self.vel * (dt / 1000.0)
+        x = self.pos[:, 0]
+        y = self.pos[:, 1]
+        b = self.bounds
+        self.alive &= (x >= b.left) & (x < b.right) & (y >= b.top) & (y < b.bottom)
+    def clear(self):
+        self.alive[:] = False
+    def draw(self, surface):
+        coords = self.pos[self.alive].astype(np.int32).tolist()
+        if coords:
+            sprite = self.sprite
+            surface.blits([(sprite, xy) for xy in coords], doreturn=False)
@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+# ------------------------------
+# Spelarprofiler som tål krascher
+# ------------------------------
+# Varje sparad profil läggs till sist i en journal (profiles.log) som en
+# post med längd, CRC32 och löpnummer följd av profilen som JSON. En egen
+# skrivtråd tar allt som väntar i kön, skriver det i ett svep och gör en
+# enda fsync (group commit), så spelloopen väntar aldrig på disken. Efter
+# SNAPSHOT_EVERY poster skrivs alla profiler till en ögonblicksbild
+# (profiles.snapshot, atomiskt via os.replace) och journalen töms. Vid
+# start läses ögonblicksbilden och bara journalens poster efter den, så
+# laddningen tar lika lång tid oavsett hur länge man spelat. En halvskriven
+# sista post (krasch mitt i en skrivning) känns igen på längden eller
+# CRC:n och skärs bort.
+PROFILES_VERSION = 1
+RECORD_HEADER = struct.Struct("<IIQ")  # längd, crc32, löpnummer
+SNAPSHOT_EVERY = 1000
+GROUP_COMMIT_WINDOW = 0.005  # sekunder att samla fler poster före fsync
+MAX_BATCH = 256
+LOG_NAME = "profiles.log"
+SNAPSHOT_NAME = "profiles.snapshot"
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "profiles")
+
+_STOP = object()
+
+def _encode(seq, profile):
+    payload = json.dumps(profile, ensure_ascii=False, separators=(",", ":")).encode()
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload), seq) + payload
+
+def read_log(path):
+    """Journalens hela poster som (löpnummer, profil) och var den sista slutar."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    records = []
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, crc, seq = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append((seq, json.loads(payload)))
+        offset = start + length
+    return records, offset
+
+def read_snapshot(path):
+    """(löpnummer, profiler) från ögonblicksbilden, eller (0, {}) om den saknas."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return 0, {}
+    if data.get("version") != PROFILES_VERSION:
+        raise ValueError("ogiltig profilfil")
+    return data["seq"], data["profiles"]
+
+def load_profiles(directory):
+    """Ögonblicksbilden plus journalens nyare poster.
+
+    Returnerar (löpnummer, profiler, journalens giltiga längd, poster i journalen).
+    """
+    seq, profiles = read_snapshot(os.path.join(directory, SNAPSHOT_NAME))
+    records, end = read_log(os.path.join(directory, LOG_NAME))
+    for record_seq, profile in records:
+        # Poster som redan finns i ögonblicksbilden (krasch innan journalen tömdes)
+        if record_seq > seq:
+            profiles[profile["name"]] = profile
+            seq = record_seq
+    return seq, profiles, end, len(records)
+
+def _fsync_directory(directory):
+    # Så att os.replace() också överlever ett strömavbrott (finns inte på Windows)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class ProfileStore:
+    """Pengar och hus per spelarnamn; save() lämnar skrivningen till en egen tråd.
+
+    Katalogen läses och tråden startar först vid första get()/save(), så
+    att skapa lagret har inga sidoeffekter. get() läser från minnet.
+    flush() väntar tills allt som sparats ligger på disken.
+    """
+    def __init__(self, directory=DEFAULT_DIR, snapshot_every=SNAPSHOT_EVERY,
+                 group_window=GROUP_COMMIT_WINDOW):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.group_window = group_window
+        self.profiles = None
+        self.queue = queue.Queue()
+        self.thread = None
+        self.error = None
+        self.load_time = None
+        self.commits = 0  # antal fsync av journalen
+        self.records = 0
+        self.snapshots = 0
+        # Ägs av skrivtråden
+        self._state = None
+        self._seq = 0
+        self._since_snapshot = 0
+        self._log = None
+    def open(self):
+        if self.thread is None:
+            started = time.perf_counter()
+            os.makedirs(self.directory, exist_ok=True)
+            self._seq, self.profiles, end, self._since_snapshot = load_profiles(self.directory)
+            self._state = dict(self.profiles)
+            self._log = open(os.path.join(self.directory, LOG_NAME), "ab")
+            self._log.truncate(end)  # Skär bort en halvskriven sista post
+            self.load_time = time.perf_counter() - started
+            self.thread = threading.Thread(target=self._run, name="profiles", daemon=True)
+            self.thread.start()
+        return self
+    def get(self, name):
+        """Sparad profil ({"name", "money", "has_house", "updated"}) eller None."""
+        self.open()
+        return self.profiles.get(name)
+    def save(self, name, money, has_house):
+        """Sparar profilen; returnerar direkt och skrivs till disken av skrivtråden."""
+        self.open()
+        # Profilerna ändras aldrig efter att de skapats, så trådarna kan dela dem
+        profile = {"name": name, "money": money, "has_house": has_house, "updated": time.time()}
+        self.profiles[name] = profile
+        self.queue.put(profile)
+    def flush(self):
+        if self.thread is not None:
+            self.queue.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+            self._log.close()
+            self._log = None
+        self.flush()
+    def __enter__(self):
+        return self.open()
+    def __exit__(self, *exc):
+        self.close()
+    # --- Skrivtråden ---
+    def _batch(self):
+        batch = [self.queue.get()]
+        # Det som hinner komma inom fönstret får samma fsync
+        deadline = time.monotonic() + self.group_window
+        while batch[-1] is not _STOP and len(batch) < MAX_BATCH:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    def _run(self):
+        while True:
+            batch = self._batch()
+            profiles = [item for item in batch if item is not _STOP]
+            try:
+                if profiles:
+                    self._commit(profiles)
+            except OSError as error:
+                self.error = error
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if batch[-1] is _STOP:
+                return
+    def _commit(self, profiles):
+        chunks = []
+        for profile in profiles:
+            self._seq += 1
+            chunks.append(_encode(self._seq, profile))
+            self._state[profile["name"]] = profile
+        self._log.write(b"".join(chunks))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self.commits += 1
+        self.records += len(profiles)
+        self._since_snapshot += len(profiles)
+        if self._since_snapshot >= self.snapshot_every:
+            self._write_snapshot()
+    def _write_snapshot(self):
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": PROFILES_VERSION, "seq": self._seq, "profiles": self._state},
+                      f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        _fsync_directory(self.directory)
+        # Allt i journalen finns nu i ögonblicksbilden
+        self._log.truncate(0)
+        os.fsync(self._log.fileno())
+        self._since_snapshot = 0
+        self.snapshots += 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Visa eller fyll på spelarprofilerna")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIR)
+    parser.add_argument("--simulate", type=int, default=0, metavar="SAVES",
+                        help="spara så många profiler (fördelade på --players namn) först")
+    parser.add_argument("--players", type=int, default=100)
+    args = parser.parse_args(argv)
+    if args.simulate:
+        start = time.perf_counter()
+        with ProfileStore(args.directory) as store:
+            for i in range(args.simulate):
+                store.save(f"spelare{i % args.players}", 1000 + i, i % 2 == 0)
+            queued = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        print(f"{args.simulate:,} sparningar: {queued * 1e6 / args.simulate:.1f} µs i anroparen, "
+              f"{elapsed:.2f} s till disken, {store.commits:,} fsync, {store.snapshots} ögonblicksbilder")
+    store = ProfileStore(args.directory).open()
+    print(f"{len(store.profiles):,} profiler laddade på {store.load_time * 1000:.1f} ms")
+    for profile in sorted(store.profiles.values(), key=lambda p: -p["money"])[:10]:
+        print(f"  {profile['name']:20s} {profile['money']:>8,} kr" + ("  hus" if profile["has_house"] else ""))
+    store.close()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
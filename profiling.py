@@ -0,0 +1,211 @@
+import csv
+import functools
+import json
+import time
+from collections import deque
+
+import pygame
+
+import rendering
+
+# ------------------------------
+# Mätning av bildrutor och heta renderingsanrop
+# ------------------------------
+MAX_RECORDS = 100000
+HUD_INTERVAL = 500  # ms mellan uppdateringar av HUD-texten
+HUD_KEY = pygame.K_F3
+
+_MISSING = object()
+
+class Profiler:
+    """Tider per bildruta och scen, plus tid i utvalda funktioner.
+
+    Runtime:n rapporterar varje bildruta med frame(): logik (händelser och
+    uppdateringar) och rendering (draw) för sig. Funktioner som registreras
+    med track() byts mot en tidtagande version bara medan mätningen är
+    påslagen, så avstängd kostar den ingenting. En bildruta räknas som
+    tappad när den kom mer än en halv budget (1000/fps ms) för sent.
+    """
+    def __init__(self, fps, max_records=MAX_RECORDS):
+        self.budget = 1000.0 / fps
+        self.enabled = False
+        self.show_hud = False
+        self.hud_key = HUD_KEY
+        self.renderer = None  # för renderarens statistik i HUD:n och cache_stats()
+        self.frames = deque(maxlen=max_records)  # (scen, start, logik, rendering, heta anrop, intervall, tappade)
+        self.spans = deque(maxlen=max_records)   # (namn, kategori, start, längd)
+        self.origin = time.perf_counter()
+        self._tracked = []
+        self._depth = 0
+        self._hot_time = 0.0
+        self._last_start = None
+        self._last_scene = None
+        self._hud_lines = []
+        self._hud_updated = None
+    # --- Heta anrop ---
+    def track(self, owner, attr, name=None, category="render"):
+        """Mät anrop till owner.attr (modul eller klass) när mätningen är på."""
+        entry = [owner, attr, name or attr, category, _MISSING]
+        self._tracked.append(entry)
+        if self.enabled:
+            self._install(entry)
+    def _install(self, entry):
+        owner, attr, name, category, _ = entry
+        entry[4] = vars(owner).get(attr, _MISSING)
+        setattr(owner, attr, self._timed(getattr(owner, attr), name, category))
+    def _uninstall(self, entry):
+        owner, attr, _, _, original = entry
+        if original is _MISSING:
+            delattr(owner, attr)  # Metoden ärvdes; ta bara bort vår version
+        else:
+            setattr(owner, attr, original)
+        entry[4] = _MISSING
+    def _timed(self, func, name, category):
+        profiler = self
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            profiler._depth += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler._depth -= 1
+                duration = time.perf_counter() - start
+                profiler.spans.append((name, category, start, duration))
+                if profiler._depth == 0:
+                    profiler._hot_time += duration
+        return timed
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            for entry in self._tracked:
+                self._install(entry)
+    def disable(self):
+        if self.enabled:
+            self.enabled = False
+            for entry in reversed(self._tracked):
+                self._uninstall(entry)
+    def toggle_hud(self):
+        """HUD:n slår också på mätningen."""
+        self.show_hud = not self.show_hud
+        if self.show_hud:
+            self.enable()
+        self._hud_updated = None
+    # --- Bildrutor ---
+    def frame(self, scene, start, logic_end, end, idle=False):
+        """Anropas av runtime:n efter varje ritad bildruta (tider från perf_counter)."""
+        if not self.enabled:
+            return
+        if scene != self._last_scene:
+            self._last_start = None  # Scenbytet ritar ingen bildruta
+        self._last_scene = scene
+        interval = (start - self._last_start) * 1000 if self._last_start is not None else 0.0
+        # Väntan i pygame.event.wait() är inte en tappad bildruta
+        dropped = 0 if idle or self._last_start is None else max(0, int(interval / self.budget + 0.5) - 1)
+        self._last_start = None if idle else start
+        self.frames.append((scene, start, (logic_end - start) * 1000, (end - logic_end) * 1000,
+                            self._hot_time * 1000, interval, dropped))
+        self._hot_time = 0.0
+    def reset(self):
+        self.frames.clear()
+        self.spans.clear()
+        self._last_start = None
+        self._hot_time = 0.0
+    def summary(self):
+        """Sammanställning per scen, tider i ms."""
+        scenes = {}
+        for scene, _, logic, render, hot, interval, dropped in self.frames:
+            scenes.setdefault(scene, []).append((logic, render, hot, interval, dropped))
+        report = {}
+        for scene, rows in scenes.items():
+            totals = sorted(logic + render for logic, render, _, _, _ in rows)
+            n = len(rows)
+            report[scene] = {
+                "frames": n,
+                "mean_ms": sum(totals) / n,
+                "p95_ms": totals[min(n - 1, int(n * 0.95))],
+                "max_ms": totals[-1],
+                "logic_ms": sum(r[0] for r in rows) / n,
+                "render_ms": sum(r[1] for r in rows) / n,
+                "tracked_ms": sum(r[2] for r in rows) / n,
+                "dropped": sum(r[4] for r in rows),
+            }
+        return report
+    def span_summary(self):
+        """Antal anrop och total tid i ms per mätt funktion."""
+        report = {}
+        for name, _, _, duration in self.spans:
+            calls, total = report.get(name, (0, 0.0))
+            report[name] = (calls + 1, total + duration * 1000)
+        return {name: {"calls": calls, "total_ms": total} for name, (calls, total) in report.items()}
+    def cache_stats(self):
+        """Textcachens och renderarens räknare (se rendering.py)."""
+        stats = {"text_cache": rendering.text_cache.stats()}
+        if self.renderer is not None:
+            stats["renderer"] = self.renderer.stats()
+        return stats
+    # --- Export ---
+    def chrome_trace(self):
+        """Händelser i Chromes trace-format (chrome://tracing, Perfetto)."""
+        def us(t):
+            return (t - self.origin) * 1e6
+        events = []
+        for scene, start, logic, render, hot, interval, dropped in self.frames:
+            args = {"scene": scene, "dropped": dropped}
+            events.append({"name": scene, "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": us(start), "dur": (logic + render) * 1000, "args": args})
+            events.append({"name": "logic", "cat": "logic", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": us(start), "dur": logic * 1000})
+            events.append({"name": "render", "cat": "render", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": us(start) + logic * 1000, "dur": render * 1000})
+        for name, category, start, duration in self.spans:
+            events.append({"name": name, "cat": category, "ph": "X", "pid": 1, "tid": 1,
+                           "ts": us(start), "dur": duration * 1e6})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+    def write_csv(self, path):
+        """En rad per bildruta."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "scene", "start_ms", "logic_ms", "render_ms", "tracked_ms", "interval_ms", "dropped"])
+            for i, (scene, start, logic, render, hot, interval, dropped) in enumerate(self.frames):
+                writer.writerow([i, scene, f"{(start - self.origin) * 1000:.3f}", f"{logic:.3f}",
+                                 f"{render:.3f}", f"{hot:.3f}", f"{interval:.3f}", dropped])
+    # --- HUD ---
+    def _update_hud(self):
+        recent = list(self.frames)[-30:]
+        if not recent:
+            self._hud_lines = ["Profil: inga bildrutor än"]
+            return
+        scene = recent[-1][0]
+        n = len(recent)
+        logic = sum(r[2] for r in recent) / n
+        render = sum(r[3] for r in recent) / n
+        hot = sum(r[4] for r in recent) / n
+        intervals = [r[5] for r in recent if r[5] > 0]
+        fps = 1000 * len(intervals) / sum(intervals) if intervals else 0.0
+        dropped = sum(r[6] for r in self.frames if r[0] == scene)
+        self._hud_lines = [
+            f"{scene}  {fps:.1f} fps",
+            f"logik {logic:.2f} ms  rendering {render:.2f} ms (mätt {hot:.2f})",
+            f"budget {self.budget:.1f} ms  tappade {dropped}",
+        ]
+        stats = self.cache_stats()
+        text = stats["text_cache"]
+        line = f"textcache {text['hit_rate']:.0%} träffar, {text['misses']} missar, {text['entries']} ytor"
+        if "renderer" in stats:
+            line += f"  omritat {stats['renderer']['fill_ratio']:.0%}"
+        self._hud_lines.append(line)
+    def draw_hud(self, surface):
+        now = pygame.time.get_ticks()
+        if self._hud_updated is None or now - self._hud_updated >= HUD_INTERVAL:
+            self._update_hud()
+            self._hud_updated = now
+        y = 4
+        for line in self._hud_lines:
+            # Direkt mot cachen så att HUD:n inte mäter sig själv
+            text = rendering.text_cache.render(line, 20, (255, 255, 0))
+            surface.blit(text, (4, y))
+            y += text.get_height() + 2
@@ -0,0 +1,437 @@
+from collections import OrderedDict
+
+import pygame
+
+# ------------------------------
+# Fontregister och cache för renderad text
+# ------------------------------
+TEXT_CACHE_SIZE = 512
+
+_fonts = {}
+
+def get_font(size):
+    """En delad Font per storlek i stället för en ny vid varje anrop."""
+    font = _fonts.get(size)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+class TextCache:
+    """LRU-cache med renderade textytor, nyckel (text, storlek, färg)."""
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.keys = {}  # yta -> nyckel, så att en yta kan renderas om i annan storlek
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    def render(self, text, size, color):
+        key = (text, size, tuple(color))
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = get_font(size).render(text, True, color)
+        self.surfaces[key] = surf
+        self.keys[surf] = key
+        if len(self.surfaces) > self.max_entries:
+            _, evicted = self.surfaces.popitem(last=False)
+            del self.keys[evicted]
+            self.evictions += 1
+        return surf
+    def key_of(self, surface):
+        """(text, storlek, färg) för en yta från cachen, annars None."""
+        return self.keys.get(surface)
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.surfaces),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+    def reset_stats(self):
+        """Nollställer räknarna men behåller ytorna."""
+        self.hits = self.misses = self.evictions = 0
+    def clear(self):
+        self.surfaces.clear()
+        self.keys.clear()
+        self.reset_stats()
+
+text_cache = TextCache()
+
+def render_text(text, size, color):
+    return text_cache.render(text, size, color)
+
+# ------------------------------
+# Förrenderade bildrutor för text som skalas upp
+# ------------------------------
+TEXT_ANIMATION_CACHE_SIZE = 32
+
+class ScaledTextCache:
+    """Bildrutorna i en textskalning, skalade från en enda rendering.
+
+    Nyckeln är (text, storlek, färg, antal bildrutor, startskala); en
+    uppspelning blir bara blits, utan nya fonter eller renderingar.
+    """
+    def __init__(self, max_entries=TEXT_ANIMATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.animations = OrderedDict()
+    def frames(self, text, size, color, count, start_scale=0.5):
+        key = (text, size, tuple(color), count, start_scale)
+        frames = self.animations.get(key)
+        if frames is not None:
+            self.animations.move_to_end(key)
+            return frames
+        full = render_text(text, size, color)
+        width, height = full.get_size()
+        frames = []
+        for i in range(count):
+            scale = start_scale + (1 - start_scale) * i / max(1, count - 1)
+            frame_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            frames.append(full if frame_size == (width, height) else pygame.transform.smoothscale(full, frame_size))
+        self.animations[key] = frames
+        if len(self.animations) > self.max_entries:
+            self.animations.popitem(last=False)
+        return frames
+    def clear(self):
+        self.animations.clear()
+
+scaled_text = ScaledTextCache()
+
+# ------------------------------
+# Sprite-atlas: rita en gång, blitta sedan
+# ------------------------------
+class SpriteAtlas:
+    """Samlar lika stora sprites i en yta som ritas första gången de behövs.
+
+    paint(cell, key) ritar spriten för key i cell (en delyta i atlasen) och
+    ska använda cell.get_size(), så att samma funktion ger skalade varianter.
+    """
+    def __init__(self, cell_size, capacity, paint, columns=13):
+        self.cell_size = cell_size
+        self.capacity = capacity
+        self.paint = paint
+        self.columns = columns
+        self.surface = None
+        self.rects = {}
+        self.keys = {}  # rutans övre vänstra hörn -> nyckel
+        self.variants = {}
+    def _create_surface(self):
+        rows = -(-self.capacity // self.columns)
+        width, height = self.cell_size
+        self.surface = pygame.Surface((width * self.columns, height * rows), pygame.SRCALPHA)
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+    def rect_for(self, key):
+        rect = self.rects.get(key)
+        if rect is None:
+            if self.surface is None:
+                self._create_surface()
+            slot = len(self.rects)
+            if slot >= self.capacity:
+                raise ValueError(f"atlasen är full ({self.capacity} sprites)")
+            width, height = self.cell_size
+            rect = pygame.Rect((slot % self.columns) * width, (slot // self.columns) * height, width, height)
+            self.paint(self.surface.subsurface(rect), key)
+            self.rects[key] = rect
+            self.keys[rect.topleft] = key
+        return rect
+    def key_at(self, area):
+        """Nyckeln för spriten i area (en rektangel från rect_for), annars None."""
+        area = pygame.Rect(area)
+        key = self.keys.get(area.topleft)
+        if key is None or area.size != tuple(self.cell_size):
+            return None
+        return key
+    def prerender(self, keys):
+        for key in keys:
+            self.rect_for(key)
+    def blit(self, target, key, pos):
+        rect = self.rect_for(key)
+        return target.blit(self.surface, pos, rect)
+    def scaled(self, cell_size):
+        """Samma sprites i en annan storlek, ritade om för skarp text."""
+        cell_size = tuple(cell_size)
+        if cell_size == tuple(self.cell_size):
+            return self
+        atlas = self.variants.get(cell_size)
+        if atlas is None:
+            atlas = self.variants[cell_size] = SpriteAtlas(cell_size, self.capacity, self.paint, self.columns)
+        return atlas
+
+# ------------------------------
+# Gradienter som smala remsor som skalas upp
+# ------------------------------
+GRADIENT_CACHE_SIZE = 256
+
+class GradientCache:
+    """Vertikala gradienter sparas som 1 pixel breda remsor (LRU, nyckel per färgpar).
+
+    Att rita en gradient blir en skalning av remsan i stället för en
+    draw.line per rad och en ny helskärmsyta per bildruta.
+    """
+    def __init__(self, max_strips=GRADIENT_CACHE_SIZE):
+        self.max_strips = max_strips
+        self.strips = OrderedDict()
+    def strip(self, height, top_color, bottom_color, like=None):
+        bitsize = like.get_bitsize() if like is not None else 0
+        key = (height, tuple(top_color), tuple(bottom_color), bitsize)
+        strip = self.strips.get(key)
+        if strip is not None:
+            self.strips.move_to_end(key)
+            return strip
+        strip = pygame.Surface((1, height), 0, like) if like is not None else pygame.Surface((1, height))
+        for y in range(height):
+            ratio = y / height
+            r = int(top_color[0] * (1 - ratio) + bottom_color[0] * ratio)
+            g = int(top_color[1] * (1 - ratio) + bottom_color[1] * ratio)
+            b = int(top_color[2] * (1 - ratio) + bottom_color[2] * ratio)
+            strip.set_at((0, y), (r, g, b))
+        self.strips[key] = strip
+        if len(self.strips) > self.max_strips:
+            self.strips.popitem(last=False)
+        return strip
+    def surface(self, size, top_color, bottom_color):
+        """En ny yta med gradienten, för bakgrunder som byggs en gång."""
+        width, height = size
+        return pygame.transform.scale(self.strip(height, top_color, bottom_color), (width, height))
+    def draw(self, target, top_color, bottom_color):
+        """Fyller hela target med gradienten genom att skala remsan direkt in i den."""
+        size = target.get_size()
+        strip = self.strip(size[1], top_color, bottom_color, like=target)
+        try:
+            pygame.transform.scale(strip, size, target)
+        except ValueError:
+            target.blit(pygame.transform.scale(strip, size), (0, 0))
+
+gradients = GradientCache()
+
+# ------------------------------
+# Rendering med smutsiga rektanglar (valfritt läge)
+# ------------------------------
+FULL_REDRAW_RATIO = 0.5
+
+class DirtyRenderer:
+    """Tar emot blits som en Surface och jämför med förra bildrutan.
+
+    Skärmarna ritar som vanligt via blit(), men bara områden där något
+    har ändrats (ny yta, ny position eller borttaget) ritas om och
+    skickas med pygame.display.update(rects). Ytorna från TextCache och
+    SpriteAtlas är samma objekt så länge de är oförändrade, vilket gör
+    jämförelsen billig. Med enabled=False ritas allt och flip() anropas,
+    precis som tidigare.
+    """
+    def __init__(self, screen, enabled=False):
+        self.screen = screen
+        self.enabled = enabled
+        self.background = None
+        self.items = []
+        self.previous = []
+        self.full_redraw = True
+        self.frames = 0
+        self.full_frames = 0
+        self.pixels_drawn = 0
+    def get_size(self):
+        return self.screen.get_size()
+    def logical_pos(self, pos):
+        """Fönsterkoordinater i skärmarnas koordinater (samma här)."""
+        return pos
+    def window_pos(self, pos):
+        """Tvärtom mot logical_pos(), t.ex. för skriptade musklick."""
+        return pos
+    def present_screen(self, surface):
+        """Visar en skärm som ritats direkt på surface (utan blits hit)."""
+        if surface is not self.screen:
+            self.screen.blit(surface, (0, 0))
+        pygame.display.flip()
+        self.invalidate()
+    def invalidate(self):
+        """Nästa bildruta ritas helt, t.ex. när någon annan ritat på skärmen."""
+        self.full_redraw = True
+    def begin(self, background):
+        if background is not self.background:
+            self.background = background
+            self.full_redraw = True
+        self.items = []
+    def blit(self, surface, dest, area=None):
+        x, y = dest[0], dest[1]
+        if area is None:
+            rect = pygame.Rect(x, y, surface.get_width(), surface.get_height())
+        else:
+            area = pygame.Rect(area)
+            rect = pygame.Rect(x, y, area.width, area.height)
+        self.items.append((surface, rect, area))
+        return rect
+    def _dirty_rects(self):
+        dirty = []
+        for i in range(max(len(self.items), len(self.previous))):
+            new = self.items[i] if i < len(self.items) else None
+            old = self.previous[i] if i < len(self.previous) else None
+            if new is not None and old is not None and new[0] is old[0] and new[1] == old[1] and new[2] == old[2]:
+                continue
+            if old is not None:
+                dirty.append(old[1])
+            if new is not None:
+                dirty.append(new[1])
+        screen_rect = self.screen.get_rect()
+        dirty = [rect.clip(screen_rect) for rect in dirty]
+        return [rect for rect in dirty if rect.width and rect.height]
+    def present(self):
+        self.frames += 1
+        screen_area = self.screen.get_width() * self.screen.get_height()
+        dirty = None if (self.full_redraw or not self.enabled) else self._dirty_rects()
+        if dirty is not None and sum(r.width * r.height for r in dirty) > screen_area * FULL_REDRAW_RATIO:
+            dirty = None
+        if dirty is None:
+            self.full_frames += 1
+            self.screen.blit(self.background, (0, 0))
+            for surface, rect, area in self.items:
+                self.screen.blit(surface, rect, area)
+            self.pixels_drawn += screen_area
+            pygame.display.flip()
+        elif dirty:
+            for clip in dirty:
+                self.screen.set_clip(clip)
+                self.screen.blit(self.background, clip, clip)
+                for surface, rect, area in self.items:
+                    if rect.colliderect(clip):
+                        self.screen.blit(surface, rect, area)
+                self.pixels_drawn += clip.width * clip.height
+            self.screen.set_clip(None)
+            pygame.display.update(dirty)
+        self.previous = self.items
+        self.full_redraw = False
+    def reset_stats(self):
+        self.frames = self.full_frames = self.pixels_drawn = 0
+    def stats(self):
+        """Bildrutor via present(), hur många som ritades helt och andel av skärmen som ritats om."""
+        screen_area = self.screen.get_width() * self.screen.get_height()
+        return {
+            "frames": self.frames,
+            "full_frames": self.full_frames,
+            "fill_ratio": self.pixels_drawn / (self.frames * screen_area) if self.frames else 0.0,
+        }
+
+# ------------------------------
+# Logisk upplösning skalad till fönstret
+# ------------------------------
+SCALED_LAYER_CACHE_SIZE = 1024
+LETTERBOX_COLOR = (0, 0, 0)
+
+class ScaledRenderer(DirtyRenderer):
+    """DirtyRenderer för ett fönster större (eller mindre) än skärmarnas koordinater.
+
+    Skärmarna ritar i logical_size som vanligt. Varje yta som blittas byts
+    mot en variant i fönstrets skala som skapas en gång och sparas (LRU,
+    per källyta): text renderas om i större storlek, sprites från atlaser
+    som registrerats med register_atlas() ritas om via SpriteAtlas.scaled(),
+    och allt annat (bakgrunden, paneler, knappar) skalas med smoothscale.
+    En bildruta blir då samma blits som förut, bara i fönstrets upplösning.
+    Bilden skalas lika mycket på bredden och höjden och centreras, med svarta
+    kanter om proportionerna skiljer sig. Skärmar som ritar direkt (inte
+    retained) skalas i stället som en hel bild i present_screen().
+    """
+    def __init__(self, screen, logical_size, enabled=False, max_layers=SCALED_LAYER_CACHE_SIZE):
+        super().__init__(screen, enabled)
+        self.logical_size = tuple(logical_size)
+        self.max_layers = max_layers
+        self.layers = OrderedDict()
+        self.atlases = []
+        self.resize()
+    def resize(self):
+        """Räknar om skalan efter fönstrets storlek och slänger de skalade lagren."""
+        width, height = self.screen.get_size()
+        logical_width, logical_height = self.logical_size
+        self.scale = min(width / logical_width, height / logical_height)
+        size = (round(logical_width * self.scale), round(logical_height * self.scale))
+        self.viewport = pygame.Rect(((width - size[0]) // 2, (height - size[1]) // 2), size)
+        self._viewport_surface = self.screen.subsurface(self.viewport)
+        self.layers.clear()
+        self.background = None
+        self.invalidate()
+    def register_atlas(self, atlas):
+        self.atlases.append(atlas)
+    def get_size(self):
+        return self.logical_size
+    def logical_pos(self, pos):
+        return (int((pos[0] - self.viewport.x) / self.scale), int((pos[1] - self.viewport.y) / self.scale))
+    def window_pos(self, pos):
+        return (self.viewport.x + round(pos[0] * self.scale), self.viewport.y + round(pos[1] * self.scale))
+    def _scaled_size(self, size):
+        return (max(1, round(size[0] * self.scale)), max(1, round(size[1] * self.scale)))
+    def _layer(self, surface, area):
+        key = (surface, None if area is None else tuple(area))
+        layer = self.layers.get(key)
+        if layer is not None:
+            self.layers.move_to_end(key)
+            return layer
+        layer = self.layers[key] = self._scale_layer(surface, area)
+        if len(self.layers) > self.max_layers:
+            self.layers.popitem(last=False)
+        return layer
+    def _scale_layer(self, surface, area):
+        if area is not None:
+            for atlas in self.atlases:
+                sprite = atlas.key_at(area) if surface is atlas.surface else None
+                if sprite is not None:
+                    scaled = atlas.scaled(self._scaled_size(atlas.cell_size))
+                    rect = scaled.rect_for(sprite)
+                    return scaled.surface, rect
+        else:
+            key = text_cache.key_of(surface)
+            if key is not None:
+                text, size, color = key
+                return get_font(max(1, round(size * self.scale))).render(text, True, color), None
+        source = surface if area is None else surface.subsurface(pygame.Rect(area).clip(surface.get_rect()))
+        return _smoothscale(source, self._scaled_size(source.get_size())), None
+    def _background_layer(self, background):
+        key = (background, "background")
+        layer = self.layers.get(key)
+        if layer is None:
+            layer = pygame.Surface(self.screen.get_size()).convert(self.screen)
+            layer.fill(LETTERBOX_COLOR)
+            layer.blit(_smoothscale(background, self.viewport.size), self.viewport)
+            layer = self.layers[key] = (layer, None)
+        return layer[0]
+    def begin(self, background):
+        super().begin(self._background_layer(background))
+    def blit(self, surface, dest, area=None):
+        scaled, scaled_area = self._layer(surface, area)
+        x = self.viewport.x + round(dest[0] * self.scale)
+        y = self.viewport.y + round(dest[1] * self.scale)
+        return super().blit(scaled, (x, y), scaled_area)
+    def present_screen(self, surface):
+        _smoothscale(surface, self.viewport.size, self._viewport_surface)
+        pygame.display.flip()
+        self.invalidate()
+
+def _smoothscale(surface, size, dest=None):
+    """smoothscale, eller vanlig scale för ytor som den inte klarar (t.ex. 8 bitar)."""
+    try:
+        if dest is None:
+            return pygame.transform.smoothscale(surface, size)
+        return pygame.transform.smoothscale(surface, size, dest)
+    except ValueError:
+        if dest is None:
+            return pygame.transform.scale(surface, size)
+        return pygame.transform.scale(surface, size, dest)
+
+_panels = {}
+
+def panel_surface(size, fill_color, border_color, border=2, radius=8):
+    """En cachad rundad ruta (knappar, inmatningsrutor) som kan blittas."""
+    key = (tuple(size), tuple(fill_color), tuple(border_color), border, radius)
+    surf = _panels.get(key)
+    if surf is None:
+        surf = pygame.Surface(size, pygame.SRCALPHA)
+        rect = surf.get_rect()
+        pygame.draw.rect(surf, fill_color, rect, border_radius=radius)
+        pygame.draw.rect(surf, border_color, rect, border, border_radius=radius)
+        _panels[key] = surf
+    return surf
@@ -0,0 +1,228 @@
+import time
+
+import pygame
+
+# ------------------------------
+# Scener, timers och tweens som drivs av en enda huvudloop
+# ------------------------------
+MAX_STEPS_PER_FRAME = 5
+# Längsta väntan på en händelse när inget animeras (ms)
+IDLE_TIMEOUT = 500
+POINTER_EVENTS = (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+class Timer:
+    """Anropar callback när delay ms speltid har gått, utan att blockera."""
+    def __init__(self, delay, callback):
+        self.remaining = delay
+        self.callback = callback
+        self.cancelled = False
+    def update(self, dt):
+        self.remaining -= dt
+        if self.remaining <= 0 and not self.cancelled:
+            self.cancelled = True
+            self.callback()
+        return not self.cancelled
+    def cancel(self):
+        self.cancelled = True
+
+class Tween:
+    """Framsteg 0-1 över duration ms; on_done anropas när den är klar."""
+    def __init__(self, duration, on_done=None):
+        self.duration = duration
+        self.elapsed = 0.0
+        self.on_done = on_done
+        self.finished = False
+    @property
+    def progress(self):
+        return min(1.0, self.elapsed / self.duration) if self.duration > 0 else 1.0
+    def update(self, dt):
+        self.elapsed += dt
+        if not self.finished and self.elapsed >= self.duration:
+            self.finished = True
+            if self.on_done is not None:
+                self.on_done()
+        return not self.finished
+
+class Scene:
+    """En skärm i spelet. Den blockerar aldrig; runtime:n anropar
+
+    handle_event() för varje händelse, update(dt) med fast tidssteg och
+    draw() en gång per bildruta. finish(result) avslutar scenen.
+    retained-scener ritar bara blits och går via DirtyRenderer.
+    """
+    retained = False
+    background = None
+    def __init__(self):
+        self.runtime = None
+        self.elapsed = 0.0
+        self.done = False
+        self.result = None
+        self._animations = []
+    def enter(self, runtime):
+        self.runtime = runtime
+    def after(self, delay, callback):
+        timer = Timer(delay, callback)
+        self._animations.append(timer)
+        return timer
+    def tween(self, duration, on_done=None):
+        tween = Tween(duration, on_done)
+        self._animations.append(tween)
+        return tween
+    @property
+    def animating(self):
+        """Sant om scenen kan ändras utan att någon händelse kommer in."""
+        return not self.retained or bool(self._animations)
+    def finish(self, result=None):
+        self.done = True
+        self.result = result
+    def handle_event(self, event):
+        pass
+    def update(self, dt):
+        self.elapsed += dt
+        if self._animations:
+            # Timers som startas i en callback börjar räkna först nästa steg
+            running, self._animations = self._animations, []
+            self._animations = [a for a in running if a.update(dt)] + self._animations
+    def draw(self, surface):
+        pass
+
+class TimedScene(Scene):
+    """Scen som avslutar sig själv efter duration ms."""
+    duration = 1000
+    def update(self, dt):
+        super().update(dt)
+        if self.elapsed >= self.duration:
+            self.finish()
+
+class SceneRuntime:
+    """Den enda huvudloopen: händelser, fasta uppdateringssteg och ritning.
+
+    Spelflödet är en generator som yieldar scener och får tillbaka
+    scenens resultat när den är klar, så att det kan skrivas i samma
+    ordning som de gamla blockerande skärmfunktionerna.
+
+    Med adaptive=True väntar loopen med pygame.event.wait() så länge
+    scenen inte animerar, i stället för att rita fps gånger i sekunden.
+    """
+    def __init__(self, screen, renderer, clock, fps, adaptive=True):
+        self.screen = screen
+        self.renderer = renderer
+        self.clock = clock
+        self.fps = fps
+        self.step = 1000.0 / fps
+        self.time = 0.0
+        self.accumulator = 0.0
+        self.scene = None
+        self.flow = None
+        self.running = False
+        self.adaptive = adaptive
+        self.needs_draw = True
+        self.idle_frames = 0
+        self.first_frame_at = None
+        self.profiler = None
+    def _advance(self, value):
+        try:
+            scene = self.flow.send(value)
+        except StopIteration:
+            self.scene = None
+            return
+        self.scene = scene
+        scene.enter(self)
+        self.renderer.invalidate()
+        self.needs_draw = True
+    def _wait_events(self):
+        # Inget rör sig: sov tills något händer (eller IDLE_TIMEOUT gått)
+        event = pygame.event.wait(IDLE_TIMEOUT)
+        events = [] if event.type == pygame.NOEVENT else [event]
+        events.extend(pygame.event.get())
+        # Väntetiden räknas inte som speltid
+        self.clock.tick()
+        self.accumulator = 0.0
+        self.idle_frames += 1
+        return events
+    def _logical_event(self, event):
+        # Skalas skärmen (rendering.ScaledRenderer) räknas musen om till skärmarnas koordinater
+        pos = self.renderer.logical_pos(event.pos)
+        if pos == event.pos:
+            return event
+        return pygame.event.Event(event.type, {**event.dict, "pos": pos})
+    def frame(self):
+        """En bildruta: händelser, uppdateringar och ritning."""
+        idle = self.adaptive and not self.scene.animating
+        if idle and not self.needs_draw:
+            events = self._wait_events()
+        elif idle:
+            # En ny eller ändrad scen ritas direkt, utan att först vänta på input
+            events = pygame.event.get()
+        else:
+            self.accumulator += self.clock.tick(self.fps)
+            events = pygame.event.get()
+        started = time.perf_counter()
+        profiler = self.profiler
+        for i, event in enumerate(events):
+            if event.type == pygame.QUIT:
+                self.running = False
+                return
+            if event.type in POINTER_EVENTS:
+                event = self._logical_event(event)
+            if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                self.renderer.invalidate()
+            if profiler is not None and event.type == pygame.KEYDOWN and event.key == profiler.hud_key:
+                profiler.toggle_hud()
+                self.renderer.invalidate()
+                continue
+            self.scene.handle_event(event)
+            if self.scene.done:
+                # Resten av händelserna hör inte till nästa scen, men QUIT får inte försvinna
+                if any(later.type == pygame.QUIT for later in events[i + 1:]):
+                    self.running = False
+                    return
+                break
+        if events:
+            self.needs_draw = True
+        steps = 0
+        while not idle and not self.scene.done and self.accumulator >= self.step:
+            self.scene.update(self.step)
+            self.time += self.step
+            self.accumulator -= self.step
+            steps += 1
+            if steps >= MAX_STEPS_PER_FRAME:
+                # Ligger vi för långt efter hoppar vi över resten i stället för att spiral-lagga
+                self.accumulator = 0.0
+        if self.scene.done:
+            self._advance(self.scene.result)
+            return
+        if idle and not self.needs_draw:
+            return
+        logic_done = time.perf_counter()
+        self.draw()
+        self.needs_draw = False
+        if profiler is not None:
+            profiler.frame(type(self.scene).__name__, started, logic_done, time.perf_counter(), idle)
+    def draw(self):
+        scene = self.scene
+        hud = self.profiler is not None and self.profiler.show_hud
+        if scene.retained:
+            self.renderer.begin(scene.background)
+            scene.draw(self.renderer)
+            if hud:
+                self.profiler.draw_hud(self.renderer)
+            self.renderer.present()
+        else:
+            scene.draw(self.screen)
+            if hud:
+                self.profiler.draw_hud(self.screen)
+            self.renderer.present_screen(self.screen)
+        if self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+    def start(self, flow):
+        """Startar flödet och går till dess första scen."""
+        self.flow = flow
+        self.running = True
+        self._advance(None)
+    def run(self, flow):
+        """Kör flödet tills det tar slut eller fönstret stängs."""
+        self.start(flow)
+        while self.running and self.scene is not None:
+            self.frame()
+        return self.running
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+import economy
+import engine
+
+# ------------------------------
+# Spelserver med många bord över lokal TCP
+# ------------------------------
+# Protokollet är en JSON-rad per meddelande åt varje håll. Klienten skickar
+#   {"op": "join", "name": "..."}   -> bord, plats och pengar
+#   {"op": "bet", "amount": 100}    -> spelarens kort, dealerns synliga kort
+#   {"op": "hit"} / {"op": "stand"} -> nytt kort eller avgjord runda
+#   {"op": "quit"}
+# och får alltid ett svar med "ok". En avgjord runda räknas med
+# engine.settle(), samma som i spelet: utbetalning, huset vid
+# HOUSE_THRESHOLD, hyra, och vid 0 kr armbrytning (loan_chance) -> lån
+# eller game over.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+SEATS_PER_TABLE = 7
+MAX_LINE = 4096
+
+class ProtocolError(Exception):
+    pass
+
+class Table:
+    """Ett bord med SEATS_PER_TABLE platser.
+
+    Varje plats spelar sina rundor mot dealern i egen takt och har därför
+    en egen sko. Med en gemensam sko kunde en plats satsning blanda om skon
+    (och nollställa räkningen) mitt i en annan plats hand.
+    """
+    def __init__(self, table_id):
+        self.id = table_id
+        self.seats = [None] * SEATS_PER_TABLE
+    def free_seat(self):
+        for seat, session in enumerate(self.seats):
+            if session is None:
+                return seat
+        return None
+
+class Session:
+    """En spelare vid ett bord. handle() tar ett meddelande och ger svaret."""
+    def __init__(self, name, table, seat, rules, rng):
+        self.name = name
+        self.table = table
+        self.seat = seat
+        self.rules = rules
+        self.rng = rng
+        self.shoe = engine.Shoe(rng=random.Random(rng.random()))
+        self.money = rules.start_money
+        self.has_house = False
+        self.round_ = None
+        self.bet = 0
+        self.game_over = False
+    def _hand(self, hand):
+        return [card.code for card in hand.cards]
+    def handle(self, message):
+        op = message.get("op")
+        if self.game_over and op != "quit":
+            raise ProtocolError("spelet är slut")
+        if op == "bet":
+            return self.place_bet(message.get("amount"))
+        if op == "hit":
+            return self.hit()
+        if op == "stand":
+            return self.stand()
+        if op == "quit":
+            return {"ok": True, "money": self.money}
+        raise ProtocolError(f"okänd op: {op!r}")
+    def place_bet(self, amount):
+        if self.round_ is not None:
+            raise ProtocolError("rundan pågår redan")
+        # Samma gränser som betting_screen(): minst 1, högst det man har
+        if not isinstance(amount, int) or isinstance(amount, bool) or not 0 < amount <= self.money:
+            raise ProtocolError("ogiltig insats")
+        self.bet = amount
+        self.round_ = engine.Round(self.shoe)
+        return {"ok": True, "player": self._hand(self.round_.player_hand),
+                "value": self.round_.player_hand.get_value(),
+                "upcard": self.round_.dealer_hand.cards[1].code}
+    def _current_round(self):
+        if self.round_ is None:
+            raise ProtocolError("ingen runda pågår")
+        return self.round_
+    def hit(self):
+        round_ = self._current_round()
+        card = round_.hit()
+        reply = {"ok": True, "card": card.code, "value": round_.player_hand.get_value()}
+        if round_.done:
+            reply.update(self.settle())
+        return reply
+    def stand(self):
+        round_ = self._current_round()
+        round_.stand()
+        round_.finish()
+        return {"ok": True, **self.settle()}
+    def settle(self):
+        """Avgör rundan och ekonomin efteråt med engine.settle(), som i spelet."""
+        round_ = self.round_
+        self.round_ = None
+        payout = round_.payout(self.bet)
+        won_arm_wrestle = self.rng.random() < self.rules.loan_chance
+        self.money, self.has_house, events = engine.settle(self.money, self.has_house, payout,
+                                                           won_arm_wrestle, self.rules)
+        self.game_over = "game_over" in events
+        return {"result": engine.RESULT_NAMES[round_.result], "dealer": self._hand(round_.dealer_hand),
+                "dealer_value": round_.dealer_hand.get_value(), "payout": payout,
+                "money": self.money, "events": events}
+
+class GameServer:
+    """Asyncio-server som fördelar spelare på bord med lediga platser."""
+    def __init__(self, rules=None, seed=None):
+        self.rules = rules or economy.EconomyRules()
+        self.rng = random.Random(seed)
+        self.tables = []
+        self.sessions = 0
+        self.messages = 0
+        self.server = None
+    def join(self, name):
+        for table in self.tables:
+            seat = table.free_seat()
+            if seat is not None:
+                break
+        else:
+            table = Table(len(self.tables))
+            self.tables.append(table)
+            seat = 0
+        session = Session(name, table, seat, self.rules, random.Random(self.rng.random()))
+        table.seats[seat] = session
+        self.sessions += 1
+        return session
+    def leave(self, session):
+        session.table.seats[session.seat] = None
+        self.sessions -= 1
+    async def _client(self, reader, writer):
+        session = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.messages += 1
+                closing = False
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ProtocolError("meddelandet ska vara ett JSON-objekt")
+                    if session is None:
+                        if message.get("op") != "join":
+                            raise ProtocolError("börja med join")
+                        session = self.join(str(message.get("name", "")))
+                        reply = {"ok": True, "table": session.table.id, "seat": session.seat,
+                                 "money": session.money}
+                    else:
+                        reply = session.handle(message)
+                    closing = message.get("op") == "quit" or session.game_over
+                except (ProtocolError, ValueError) as error:
+                    reply = {"ok": False, "error": str(error)}
+                writer.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+                if closing:
+                    break
+        except (ConnectionError, ValueError):
+            # Nedkopplad klient eller för lång rad
+            pass
+        finally:
+            if session is not None:
+                self.leave(session)
+            writer.close()
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self._client, host, port, limit=MAX_LINE, backlog=4096)
+        return self.server.sockets[0].getsockname()[1]
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+async def serve(host, port, rules, seed):
+    server = GameServer(rules, seed)
+    port = await server.start(host, port)
+    print(f"Lyssnar på {host}:{port}")
+    await server.server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blackjackserver med många bord (JSON-rader över TCP)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--loan-chance", type=float, default=0.5,
+                        help="sannolikhet att vinna armbrytningen och få lån")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    rules = economy.EconomyRules(loan_chance=args.loan_chance)
+    try:
+        asyncio.run(serve(args.host, args.port, rules, args.seed))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,186 @@
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+
+import engine
+
+# ------------------------------
+# Vektoriserad Monte Carlo-simulering av många rundor samtidigt
+# ------------------------------
+# Kortvärden som heltal: ess räknas som 1 (mjukt ess hanteras i hand_value),
+# klädda kort och tior som 10. En kortlek = 4 av varje 1-9 och 16 tior.
+DECK_VALUES = np.array([v for v in range(1, 10) for _ in range(4)] + [10] * 16, dtype=np.int8)
+DEFAULT_BATCH = 1 << 16
+
+def hand_value(hard, aces):
+    """Samma mjuka ess-logik som Hand.get_value(), fast för arrayer."""
+    soft = (aces > 0) & (hard + 10 <= engine.BLACKJACK)
+    return np.where(soft, hard + 10, hard), soft
+
+def _draw(decks, ptr, rows, rng):
+    """Drar nästa kort för raderna via ett Fisher-Yates-steg per rad."""
+    p = ptr[rows]
+    j = rng.integers(p, decks.shape[1])
+    cards = decks[rows, j]
+    decks[rows, j] = decks[rows, p]
+    decks[rows, p] = cards
+    ptr[rows] = p + 1
+    return cards
+
+def play_batch(n, policy, rng, decks=engine.SHOE_DECKS):
+    """Spelar n rundor, var och en ur en nyblandad sko med decks kortlekar.
+
+    Skon vid bordet blandas bara om vid klippkortet; här blandas den per
+    runda, vilket bortser från den lilla effekten av redan utdelade kort.
+
+    Returnerar en array med resultatkoder från engine.
+    """
+    deck_cards = np.tile(DECK_VALUES, (n, decks))
+    ptr = np.zeros(n, dtype=np.intp)
+    everyone = np.arange(n)
+    player_hard = np.zeros(n, dtype=np.int16)
+    player_aces = np.zeros(n, dtype=np.int16)
+    dealer_hard = np.zeros(n, dtype=np.int16)
+    dealer_aces = np.zeros(n, dtype=np.int16)
+    # Samma ordning som Round: spelare, spelare, dealer (dold), dealer (synlig)
+    for hard, aces in ((player_hard, player_aces), (player_hard, player_aces),
+                       (dealer_hard, dealer_aces), (dealer_hard, dealer_aces)):
+        cards = _draw(deck_cards, ptr, everyone, rng)
+        hard += cards
+        aces += cards == 1
+    upcard = cards.astype(np.int16)
+
+    # Spelarens tur: policyn bestämmer vilka rader som tar kort
+    active = np.ones(n, dtype=bool)
+    while True:
+        total, soft = hand_value(player_hard, player_aces)
+        active &= total <= engine.BLACKJACK
+        rows = np.flatnonzero(active & policy.hit_mask(total, soft, upcard))
+        if rows.size == 0:
+            break
+        active[:] = False
+        active[rows] = True
+        cards = _draw(deck_cards, ptr, rows, rng)
+        player_hard[rows] += cards
+        player_aces[rows] += cards == 1
+    player_total, _ = hand_value(player_hard, player_aces)
+    player_bust = player_total > engine.BLACKJACK
+
+    # Dealerns tur: tar kort under 17, bara där spelaren inte gått över
+    while True:
+        dealer_total, _ = hand_value(dealer_hard, dealer_aces)
+        rows = np.flatnonzero(~player_bust & (dealer_total < engine.DEALER_STANDS_ON))
+        if rows.size == 0:
+            break
+        cards = _draw(deck_cards, ptr, rows, rng)
+        dealer_hard[rows] += cards
+        dealer_aces[rows] += cards == 1
+
+    result = np.full(n, engine.PUSH, dtype=np.int8)
+    result[dealer_total < player_total] = engine.PLAYER_WIN
+    result[dealer_total > player_total] = engine.DEALER_WIN
+    result[dealer_total > engine.BLACKJACK] = engine.DEALER_BUST
+    result[player_bust] = engine.PLAYER_BUST
+    return result
+
+class SimulationResult:
+    """Antal rundor per resultatkod, med EV och konfidensintervall."""
+    def __init__(self, counts=None):
+        self.counts = dict.fromkeys(engine.RESULT_NAMES, 0)
+        if counts is not None:
+            for code, count in counts.items():
+                self.counts[code] += int(count)
+    @property
+    def rounds(self):
+        return sum(self.counts.values())
+    @property
+    def wins(self):
+        return sum(c for code, c in self.counts.items() if engine.PAYOUTS[code] > 0)
+    @property
+    def losses(self):
+        return sum(c for code, c in self.counts.items() if engine.PAYOUTS[code] < 0)
+    @property
+    def pushes(self):
+        return sum(c for code, c in self.counts.items() if engine.PAYOUTS[code] == 0)
+    @property
+    def ev(self):
+        """Förväntat utfall per satsad krona."""
+        if self.rounds == 0:
+            return 0.0
+        return sum(engine.PAYOUTS[code] * c for code, c in self.counts.items()) / self.rounds
+    @property
+    def std(self):
+        if self.rounds == 0:
+            return 0.0
+        second_moment = sum(engine.PAYOUTS[code] ** 2 * c for code, c in self.counts.items()) / self.rounds
+        return math.sqrt(max(0.0, second_moment - self.ev ** 2))
+    def confidence_interval(self, z=1.96):
+        if self.rounds == 0:
+            return (0.0, 0.0)
+        half = z * self.std / math.sqrt(self.rounds)
+        return (self.ev - half, self.ev + half)
+    def merge(self, other):
+        for code, count in other.counts.items():
+            self.counts[code] += count
+        return self
+    def to_dict(self):
+        low, high = self.confidence_interval()
+        return {
+            "rounds": self.rounds,
+            "wins": self.wins,
+            "losses": self.losses,
+            "pushes": self.pushes,
+            "by_result": {engine.RESULT_NAMES[code]: c for code, c in self.counts.items()},
+            "ev": self.ev,
+            "std": self.std,
+            "ci95": [low, high],
+        }
+    def __repr__(self):
+        low, high = self.confidence_interval()
+        return (f"SimulationResult(rounds={self.rounds}, wins={self.wins}, losses={self.losses}, "
+                f"pushes={self.pushes}, ev={self.ev:+.5f}, ci95=[{low:+.5f}, {high:+.5f}])")
+
+def simulate(rounds, policy=None, seed=None, batch_size=DEFAULT_BATCH, decks=engine.SHOE_DECKS, rng=None):
+    """Simulerar rundor i omgångar om batch_size och summerar resultatet."""
+    if policy is None:
+        policy = engine.StandOn()
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    result = SimulationResult()
+    remaining = rounds
+    while remaining > 0:
+        n = min(batch_size, remaining)
+        codes = play_batch(n, policy, rng, decks=decks)
+        counts = np.bincount(codes, minlength=len(engine.RESULT_NAMES))
+        result.merge(SimulationResult(dict(enumerate(counts))))
+        remaining -= n
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo-simulering av blackjackrundor")
+    parser.add_argument("rounds", type=int, nargs="?", default=1_000_000)
+    parser.add_argument("--stand-on", type=int, default=engine.DEALER_STANDS_ON,
+                        help="spelaren stannar på denna summa eller högre")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--decks", type=int, default=engine.SHOE_DECKS)
+    parser.add_argument("--basic-strategy", action="store_true",
+                        help="spela efter den förberäknade strategitabellen i stället för --stand-on")
+    args = parser.parse_args(argv)
+    if args.basic_strategy:
+        import strategy
+        policy = strategy.load_table()
+    else:
+        policy = engine.StandOn(args.stand_on)
+    start = time.perf_counter()
+    result = simulate(args.rounds, policy, seed=args.seed,
+                      batch_size=args.batch_size, decks=args.decks)
+    elapsed = time.perf_counter() - start
+    print(result)
+    print(f"{result.rounds / elapsed:,.0f} rundor/s")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import struct
+from array import array
+
+import engine
+import odds
+
+# ------------------------------
+# Förberäknad tabell med EV för att ta kort/stanna (grundstrategi)
+# ------------------------------
+# En rad per (spelarens summa 0-21, mjuk hand, dealerns synliga kort 1-10).
+# Tabellen sparas binärt och byggs bara om när reglerna ändras.
+TABLE_VERSION = 1
+MAGIC = b"BJST"
+HEADER = struct.Struct("<4sH20s")
+TOTALS = engine.BLACKJACK + 1
+UPCARDS = 10
+ENTRIES = TOTALS * 2 * UPCARDS
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+def rules_digest():
+    """Fingeravtryck av allt som påverkar tabellen."""
+    rules = (TABLE_VERSION, engine.BLACKJACK, engine.DEALER_STANDS_ON, engine.SHOE_DECKS,
+             sorted(engine.PAYOUTS.items()))
+    return hashlib.sha1(repr(rules).encode()).digest()
+
+def table_index(total, soft, upcard):
+    return (total * 2 + soft) * UPCARDS + upcard - 1
+
+def _stand_ev(total, dealer):
+    if total > engine.BLACKJACK:
+        return -1.0
+    ev = dealer[odds.BUST]
+    for final, p in zip(odds.OUTCOMES[:odds.BUST], dealer):
+        if total > final:
+            ev += p
+        elif total < final:
+            ev -= p
+    return ev
+
+def _after_card(total, soft, value):
+    """Ny (summa, mjuk) när ett kort med värde 1-10 läggs till."""
+    hard = total - 10 if soft else total
+    has_ace = soft or value == 1
+    hard += value
+    if has_ace and hard + 10 <= engine.BLACKJACK:
+        return hard + 10, True
+    return hard, False
+
+def build_table():
+    """Räknar fram EV för stanna och ta kort för alla lägen i tabellen."""
+    stand = array('d', [0.0]) * ENTRIES
+    hit = array('d', [0.0]) * ENTRIES
+    full = odds.full_composition(engine.SHOE_DECKS)
+    for upcard in range(1, UPCARDS + 1):
+        composition = list(full)
+        composition[upcard - 1] -= 1
+        dealer = odds.dealer_distribution(upcard, composition)
+        remaining = sum(composition)
+        card_probs = [(i + 1, count / remaining) for i, count in enumerate(composition)]
+        best = {}
+        def best_ev(total, soft):
+            if total > engine.BLACKJACK:
+                return -1.0
+            key = (total, soft)
+            if key not in best:
+                best[key] = max(_stand_ev(total, dealer), hit_ev(total, soft))
+            return best[key]
+        def hit_ev(total, soft):
+            return sum(p * best_ev(*_after_card(total, soft, value)) for value, p in card_probs)
+        for total in range(TOTALS):
+            for soft in (False, True):
+                i = table_index(total, soft, upcard)
+                stand[i] = _stand_ev(total, dealer)
+                hit[i] = hit_ev(total, soft)
+    return StrategyTable(stand, hit, rules_digest())
+
+class StrategyTable:
+    """Slår upp EV och rekommendation; fungerar även som spelarstrategi."""
+    def __init__(self, stand, hit, digest):
+        self.stand = stand
+        self.hit = hit
+        self.digest = digest
+        self._hit_array = None
+    @staticmethod
+    def _upcard_value(upcard):
+        value = upcard.value if isinstance(upcard, engine.Card) else upcard
+        return 1 if value == 11 else value
+    def stand_ev(self, total, soft, upcard):
+        return self.stand[table_index(total, soft, self._upcard_value(upcard))]
+    def hit_ev(self, total, soft, upcard):
+        return self.hit[table_index(total, soft, self._upcard_value(upcard))]
+    def should_hit(self, total, soft, upcard):
+        i = table_index(total, soft, self._upcard_value(upcard))
+        return self.hit[i] > self.stand[i]
+    def __call__(self, player_hand, dealer_upcard):
+        return self.should_hit(player_hand.get_value(), player_hand.is_soft, dealer_upcard)
+    def hit_mask(self, totals, soft, upcards):
+        if self._hit_array is None:
+            import numpy as np
+            self._hit_array = np.frombuffer(self.hit, dtype=np.float64) > np.frombuffer(self.stand, dtype=np.float64)
+        upcards = upcards.astype(int)
+        upcards[upcards == 11] = 1
+        index = (totals.clip(0, TOTALS - 1) * 2 + soft) * UPCARDS + upcards - 1
+        return self._hit_array[index] & (totals <= engine.BLACKJACK)
+    def to_bytes(self):
+        return HEADER.pack(MAGIC, TABLE_VERSION, self.digest) + self.stand.tobytes() + self.hit.tobytes()
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, digest = HEADER.unpack_from(data)
+        size = ENTRIES * array('d').itemsize
+        if magic != MAGIC or version != TABLE_VERSION or len(data) != HEADER.size + 2 * size:
+            raise ValueError("ogiltig strategitabell")
+        stand = array('d')
+        stand.frombytes(data[HEADER.size:HEADER.size + size])
+        hit = array('d')
+        hit.frombytes(data[HEADER.size + size:])
+        return cls(stand, hit, digest)
+
+def table_path(digest=None):
+    digest = digest or rules_digest()
+    return os.path.join(CACHE_DIR, f"strategy-{digest.hex()[:16]}.bin")
+
+def load_table(path=None):
+    """Läser tabellen från disk, eller bygger och sparar den om reglerna ändrats."""
+    digest = rules_digest()
+    path = path or table_path(digest)
+    try:
+        with open(path, "rb") as f:
+            table = StrategyTable.from_bytes(f.read())
+        if table.digest == digest:
+            return table
+    except (OSError, ValueError, struct.error):
+        pass
+    table = build_table()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(table.to_bytes())
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # Går det inte att spara används tabellen ändå
+    return table
@@ -0,0 +1,84 @@
+import pygame
+
+import rendering
+
+# ------------------------------
+# Widgets som skapas en gång per skärm (retained mode)
+# ------------------------------
+WHITE = (255, 255, 255)
+HIT_GRID = 64
+
+# Sätts när fönstret skalas, så att musen räknas om till skärmarnas koordinater
+pointer_transform = None
+
+def mouse_position():
+    pos = pygame.mouse.get_pos()
+    return pos if pointer_transform is None else pointer_transform(pos)
+
+class Button:
+    """Knapp med rundade kanter vars normal- och hoverläge förrenderas en gång."""
+    def __init__(self, rect, color, text, text_color=WHITE, text_size=36):
+        self.rect = pygame.Rect(rect)
+        self.base_color = color
+        self.hover_color = tuple(min(255, c + 50) for c in color)
+        self.text = text
+        self.text_color = text_color
+        self.text_size = text_size
+        self.hovered = False
+        self._surfaces = None
+    def _render(self):
+        surfaces = []
+        for color in (self.base_color, self.hover_color):
+            surf = rendering.panel_surface(self.rect.size, color, WHITE).copy()
+            text_surf = rendering.render_text(self.text, self.text_size, self.text_color)
+            surf.blit(text_surf, text_surf.get_rect(center=surf.get_rect().center))
+            surfaces.append(surf)
+        self._surfaces = surfaces
+    def draw(self, surface):
+        if self._surfaces is None:
+            self._render()
+        surface.blit(self._surfaces[self.hovered], self.rect.topleft)
+
+class WidgetLayer:
+    """Widgets för en skärm med ett gemensamt rutnätsindex för träfftest.
+
+    Hover uppdateras från MOUSEMOTION i stället för att läsa musen varje
+    bildruta. Att bara rita om det som ändrats sköts av runtime:n (scener
+    ritas bara när något hänt) och av DirtyRenderer.
+    """
+    def __init__(self, widgets=()):
+        self.widgets = []
+        self.grid = {}
+        for widget in widgets:
+            self.add(widget)
+        if pygame.display.get_init() and pygame.mouse.get_focused():
+            self.update_hover(mouse_position())
+    def add(self, widget):
+        self.widgets.append(widget)
+        rect = widget.rect
+        for gx in range(rect.left // HIT_GRID, (rect.right - 1) // HIT_GRID + 1):
+            for gy in range(rect.top // HIT_GRID, (rect.bottom - 1) // HIT_GRID + 1):
+                self.grid.setdefault((gx, gy), []).append(widget)
+        return widget
+    def widget_at(self, pos):
+        # Senast tillagda widget ligger överst
+        for widget in reversed(self.grid.get((pos[0] // HIT_GRID, pos[1] // HIT_GRID), ())):
+            if widget.rect.collidepoint(pos):
+                return widget
+        return None
+    def update_hover(self, pos):
+        target = self.widget_at(pos)
+        for widget in self.widgets:
+            widget.hovered = widget is target
+    def handle_event(self, event):
+        """Returnerar widgeten som klickades, annars None."""
+        if event.type == pygame.MOUSEMOTION:
+            self.update_hover(event.pos)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            self.update_hover(event.pos)
+            widget = self.widget_at(event.pos)
+            return widget
+        return None
+    def draw(self, surface):
+        for widget in self.widgets:
+            widget.draw(surface)